@@ -2,7 +2,8 @@
 """
 from django.contrib import admin
 
-from .models import Comment, Group, Post
+from .models import Comment, Group, Post, TimelineOptOut
+from .search import filter_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -13,6 +14,14 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту постов выполняется по полнотекстовому индексу
+        вместо LIKE по всей таблице.
+        """
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     """Класс настроек для отображения модели Group
@@ -30,6 +39,16 @@ class CommentAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class TimelineOptOutAdmin(admin.ModelAdmin):
+    """Класс настроек для отображения авторов, посты которых добавляются
+    в ленту подписок при чтении.
+    """
+    list_display = ('author',)
+    search_fields = ('author__username',)
+    raw_id_fields = ('author',)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(TimelineOptOut, TimelineOptOutAdmin)
@@ -0,0 +1,285 @@
+"""Модуль для нагрузочного тестирования страниц приложения posts (команда
+benchmark). Сначала база данных заполняется данными заданного объёма
+(TIERS): пользователями, сообществами, постами, подписками и постами с
+большим числом комментариев. Записи создаются через bulk_create частями,
+текст берётся из набора предложений Faker с фиксированным seed, поэтому
+данные одинаковы от запуска к запуску. Затем страницы ленты, сообщества,
+профайла, поста и подписок запрашиваются через тестовый клиент Django, и
+для каждой страницы считаются p50 и p95 времени ответа и число
+SQL-запросов - отдельно для пустого кеша и для повторных запросов.
+Отдельно замеряется отрисовка карточек постов: прежним циклом с
+{% include %} и функцией posts.cards.render_cards.
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.template import engines
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from . import stats, timeline
+from .bulk import bulk_create_chunked
+from .cards import CARD_TEMPLATE, render_cards
+from .importer import preserve_dates
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TIERS = {
+    'small': {
+        'users': 1000,
+        'groups': 20,
+        'posts': 10000,
+        'follows': 10000,
+        'heavy_posts': 5,
+        'comments_per_heavy_post': 1000,
+    },
+    'medium': {
+        'users': 10000,
+        'groups': 100,
+        'posts': 100000,
+        'follows': 100000,
+        'heavy_posts': 10,
+        'comments_per_heavy_post': 5000,
+    },
+    'large': {
+        'users': 100000,
+        'groups': 200,
+        'posts': 1000000,
+        'follows': 100000,
+        'heavy_posts': 20,
+        'comments_per_heavy_post': 20000,
+    },
+}
+
+BATCH_SIZE = 5000
+SENTENCES = 1000
+READER = 'bench_reader'
+READER_FOLLOWS = 50
+VIEWS = ('index', 'group_posts', 'profile', 'post_view', 'follow_index')
+# Так карточки выводились в лентах до render_cards
+INCLUDE_LOOP = (
+    '{% for post in posts %}'
+    f'{{% include "{CARD_TEMPLATE}" with post=post %}}'
+    '{% endfor %}'
+)
+
+
+def seed(tier, random_seed=0):
+    """Функция заполняет базу данных записями объёма tier (словарь с теми
+    же ключами, что и у TIERS). Возвращает число созданных записей.
+    """
+    rng = random.Random(random_seed)
+    fake = Faker()
+    fake.seed_instance(random_seed)
+    sentences = [fake.paragraph() for _ in range(SENTENCES)]
+    password = make_password(None)
+    now = timezone.now()
+
+    counts = {'users': bulk_create_chunked(User, (
+        User(username=f'bench_user_{number}', password=password)
+        for number in range(tier['users'])
+    ), BATCH_SIZE)}
+    User.objects.create_user(username=READER)
+    user_ids = list(
+        User.objects.filter(username__startswith='bench_user_').values_list(
+            'pk',
+            flat=True,
+        )
+    )
+    counts['groups'] = bulk_create_chunked(Group, (
+        Group(
+            title=f'Benchmark group {number}',
+            slug=f'bench-group-{number}',
+            description=rng.choice(sentences)[:200],
+        )
+        for number in range(tier['groups'])
+    ), BATCH_SIZE)
+    group_ids = list(
+        Group.objects.filter(slug__startswith='bench-group-').values_list(
+            'pk',
+            flat=True,
+        )
+    )
+    with preserve_dates(Post):
+        counts['posts'] = bulk_create_chunked(Post, (
+            Post(
+                text=rng.choice(sentences),
+                author_id=rng.choice(user_ids),
+                # Треть постов публикуется вне сообществ
+                group_id=rng.choice(group_ids) if rng.random() < 0.67
+                else None,
+                pub_date=now - timedelta(minutes=number),
+                updated=now - timedelta(minutes=number),
+            )
+            for number in range(tier['posts'])
+        ), BATCH_SIZE)
+
+    pairs = set()
+    while len(pairs) < min(tier['follows'], len(user_ids) ** 2 // 2):
+        user_id, author_id = rng.sample(user_ids, 2)
+        pairs.add((user_id, author_id))
+    counts['follows'] = bulk_create_chunked(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in pairs
+    ), BATCH_SIZE)
+
+    heavy_posts = list(
+        Post.objects.values_list('pk', flat=True)[:tier['heavy_posts']]
+    )
+    per_post = tier['comments_per_heavy_post']
+    with preserve_dates(Comment):
+        counts['comments'] = bulk_create_chunked(Comment, (
+            Comment(
+                text=rng.choice(sentences),
+                post_id=post_id,
+                author_id=rng.choice(user_ids),
+                created=now - timedelta(seconds=number),
+            )
+            for post_id in heavy_posts
+            for number in range(per_post)
+        ), BATCH_SIZE)
+    Post.objects.filter(pk__in=heavy_posts).update(comments_count=per_post)
+
+    # Ленты подписок нужны только читателю, от имени которого
+    # запрашивается страница подписок
+    reader = User.objects.get(username=READER)
+    authors = list(
+        Post.objects.values('author_id').annotate(
+            posts=Count('pk')
+        ).order_by('-posts').values_list('author_id', flat=True)[
+            :READER_FOLLOWS
+        ]
+    )
+    Follow.objects.bulk_create(
+        Follow(user=reader, author_id=author_id) for author_id in authors
+    )
+    timeline.backfill_many((reader.pk, author_id) for author_id in authors)
+    stats.recount(batch_size=BATCH_SIZE)
+    return counts
+
+
+def _percentile(values, percent):
+    """Функция возвращает перцентиль percent значений values методом
+    ближайшего ранга.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def _pages():
+    """Функция возвращает адреса страниц для замера: самые тяжёлые
+    сообщество, профайл и пост.
+    """
+    group = Group.objects.annotate(
+        posts_count=Count('posts')
+    ).order_by('-posts_count').first()
+    author = User.objects.filter(stats__isnull=False).order_by(
+        '-stats__posts_count'
+    ).first()
+    post = Post.objects.select_related('author').order_by(
+        '-comments_count',
+        'pk',
+    ).first()
+    return {
+        'index': reverse('index'),
+        'group_posts': reverse('group_posts', args=[group.slug]),
+        'profile': reverse('profile', args=[author.username]),
+        'post_view': reverse('post', args=[post.author.username, post.pk]),
+        'follow_index': reverse('follow_index'),
+    }
+
+
+def _measure(client, url, requests, cold):
+    timings, queries = [], []
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} answered {response.status_code}')
+        timings.append(elapsed * 1000)
+        queries.append(len(captured))
+    return {
+        'p50_ms': round(_percentile(timings, 50), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+        'queries': max(queries),
+    }
+
+
+def run(requests=50, views=VIEWS):
+    """Функция запрашивает страницы views по requests раз с пустым кешем
+    (cold) и с заполненным кешем (warm). Возвращает словарь
+    {страница: {'url', 'cold', 'warm'}} с p50, p95 в миллисекундах и
+    наибольшим числом SQL-запросов.
+    """
+    client = Client()
+    client.force_login(User.objects.get(username=READER))
+    pages = _pages()
+    results = {}
+    for view in views:
+        url = pages[view]
+        # Первый запрос создаёт счётчики и кеш шаблонов, не учитываем его
+        client.get(url)
+        results[view] = {
+            'url': url,
+            'cold': _measure(client, url, requests, cold=True),
+            'warm': _measure(client, url, requests, cold=False),
+        }
+    return results
+
+
+def _per_card(render, cards, repeat, cold):
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) / cards)
+    return round(statistics.median(timings) * 1000000, 1)
+
+
+def measure_cards(cards=10, repeat=20):
+    """Функция замеряет время отрисовки одной карточки поста в
+    микросекундах (медиана repeat повторов для страницы из cards постов):
+    include - цикл {% include %} в шаблоне ленты, compiled - render_cards
+    при пустом кеше, cached - render_cards с карточками в кеше.
+    """
+    posts = list(Post.objects.select_related('author', 'group')[:cards])
+    loop = engines['django'].from_string(INCLUDE_LOOP)
+    return {
+        'cards': len(posts),
+        'include_us': _per_card(
+            lambda: loop.render({'posts': posts}),
+            len(posts),
+            repeat,
+            cold=True,
+        ),
+        'compiled_us': _per_card(
+            lambda: render_cards(posts),
+            len(posts),
+            repeat,
+            cold=True,
+        ),
+        'cached_us': _per_card(
+            lambda: render_cards(posts),
+            len(posts),
+            repeat,
+            cold=False,
+        ),
+    }
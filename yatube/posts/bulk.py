@@ -0,0 +1,19 @@
+"""Модуль для создания большого числа записей частями.
+"""
+from itertools import islice
+
+
+def bulk_create_chunked(model, objects, batch_size, **kwargs):
+    """Функция создаёт объекты objects модели model частями по batch_size,
+    не собирая их в один список (bulk_create в Django 2.2 делает именно
+    это). Остальные параметры передаются bulk_create. Возвращает число
+    переданных объектов.
+    """
+    objects = iter(objects)
+    created = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return created
+        model.objects.bulk_create(batch, **kwargs)
+        created += len(batch)
@@ -0,0 +1,108 @@
+"""Модуль со счётчиками поколений для ключей кеша страниц.
+Каждая лента (главная страница, сообщество, автор) имеет свой счётчик,
+который увеличивается при изменении постов и комментариев этой ленты.
+Счётчик входит в ключ кеша фрагментов шаблонов, поэтому в общем для всех
+процессов кеше фрагменты можно хранить долго: после изменения ленты старые
+фрагменты просто перестают читаться.
+Здесь же хранится число постов каждой ленты для паджинатора.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+INDEX = 'index'
+KEY_PREFIX = 'posts:generation:'
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def follow_scope(user_id):
+    """Поколение подписок пользователя: меняется, когда он подписывается
+    или отписывается и когда подписываются или отписываются от него.
+    """
+    return f'follow:{user_id}'
+
+
+def post_scopes(group_id, author_id):
+    """Функция возвращает ленты, в которых показывается пост.
+    """
+    scopes = [INDEX, author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def _initial():
+    # Случайное начальное значение не даёт прочитать фрагменты, оставшиеся
+    # в кеше от прежнего счётчика, если счётчик был вытеснен из кеша.
+    return random.randint(1, 2 ** 31)
+
+
+def get_generations(*scopes):
+    """Функция возвращает строку из текущих значений счётчиков scopes для
+    ключа кеша.
+    """
+    keys = [KEY_PREFIX + scope for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _initial(), settings.POSTS_GENERATION_TIMEOUT)
+            generations[key] = cache.get(key)
+    return '-'.join(str(generations[key]) for key in keys)
+
+
+def bump(*scopes):
+    """Функция увеличивает счётчики scopes, делая недействительными
+    закешированные фрагменты этих лент.
+    """
+    for scope in scopes:
+        key = KEY_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), settings.POSTS_GENERATION_TIMEOUT)
+
+
+COUNT_PREFIX = 'posts:count:'
+CHECKED_SUFFIX = ':checked'
+
+
+def get_count(scope, exact_count):
+    """Функция возвращает число постов ленты scope из кеша. Точный подсчёт
+    exact_count() выполняется, если значения нет в кеше, если лента
+    небольшая или если с прошлой сверки прошло больше
+    POSTS_COUNT_RECONCILE_INTERVAL секунд.
+    """
+    key = COUNT_PREFIX + scope
+    values = cache.get_many([key, key + CHECKED_SUFFIX])
+    count = values.get(key)
+    if (
+        count is not None
+        and count >= settings.POSTS_EXACT_COUNT_LIMIT
+        and key + CHECKED_SUFFIX in values
+    ):
+        return count
+    count = exact_count()
+    cache.set(key, count, settings.POSTS_GENERATION_TIMEOUT)
+    cache.set(
+        key + CHECKED_SUFFIX,
+        True,
+        settings.POSTS_COUNT_RECONCILE_INTERVAL,
+    )
+    return count
+
+
+def change_count(delta, *scopes):
+    """Функция изменяет на delta закешированное число постов лент scopes.
+    Отсутствующие в кеше значения будут подсчитаны при чтении.
+    """
+    for scope in scopes:
+        try:
+            cache.incr(COUNT_PREFIX + scope, delta)
+        except ValueError:
+            pass
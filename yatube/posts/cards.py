@@ -0,0 +1,61 @@
+"""Модуль для вывода карточек постов (posts/post_item.html) с кешем.
+Карточка не зависит от пользователя, который её смотрит: кнопка
+редактирования заменена меткой {% hole %} (см. posts.holes).
+Поэтому одна закешированная карточка используется во всех лентах и для
+всех пользователей.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template import Context
+from django.template.loader import get_template
+
+from .thumbnails import resolve_thumbnails
+
+KEY_PREFIX = 'posts:card:'
+CARD_TEMPLATE = 'posts/post_item.html'
+
+
+def card_key(post):
+    """Функция возвращает ключ кеша карточки поста. Ключ меняется при
+    редактировании поста, изменении числа комментариев и имени автора.
+    """
+    version = int(post.updated.timestamp() * 1000000)
+    author = hashlib.md5(
+        f'{post.author.username}\n{post.author}'.encode()
+    ).hexdigest()[:8]
+    return f'{KEY_PREFIX}{post.pk}:{version}:{post.comments_count}:{author}'
+
+
+def render_cards(posts):
+    """Функция возвращает HTML карточек постов. Закешированные карточки
+    читаются из кеша одним запросом, остальные отрисовываются и
+    сохраняются в кеш. Миниатюры картинок для отрисовки находятся заранее
+    для всех карточек сразу.
+    """
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    stale = [
+        (post, key) for post, key in zip(posts, keys) if key not in cards
+    ]
+    thumbnails = resolve_thumbnails(
+        [post.image for post, _ in stale if post.image],
+        'card',
+    )
+    missing = {}
+    if stale:
+        # Шаблон загружается один раз на страницу, а карточки отрисовываются
+        # в одном контексте: для каждой в него добавляется только post
+        template = get_template(CARD_TEMPLATE).template
+        context = Context(
+            {'thumbnails': thumbnails},
+            autoescape=template.engine.autoescape,
+        )
+        for post, key in stale:
+            with context.push(post=post):
+                missing[key] = template.render(context)
+    if missing:
+        cache.set_many(missing, settings.POSTS_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [cards[key] for key in keys]
@@ -0,0 +1,88 @@
+"""Модуль для выгрузки сообществ, постов, комментариев и подписок в
+сжатые файлы JSONL (команда export_content). Записи читаются из базы
+данных частями через QuerySet.iterator(), поэтому память не зависит от
+числа строк. Поля записей совпадают с полями, которые принимает команда
+import_content (posts.importer): авторы и сообщества указываются по
+username и slug.
+"""
+import gzip
+import json
+import os
+
+from .models import Comment, Follow, Group, Post
+
+EXPORTS = {
+    'groups': (
+        Group,
+        None,
+        {'title': 'title', 'slug': 'slug', 'description': 'description'},
+    ),
+    'posts': (
+        Post,
+        'pub_date',
+        {
+            'id': 'pk',
+            'text': 'text',
+            'author': 'author__username',
+            'group': 'group__slug',
+            'pub_date': 'pub_date',
+            'image': 'image',
+        },
+    ),
+    'comments': (
+        Comment,
+        'created',
+        {
+            'id': 'pk',
+            'post': 'post_id',
+            'text': 'text',
+            'author': 'author__username',
+            'created': 'created',
+        },
+    ),
+    'follows': (
+        Follow,
+        None,
+        {'user': 'user__username', 'author': 'author__username'},
+    ),
+}
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_records(kind, since=None, chunk_size=2000):
+    """Функция возвращает итератор по записям вида kind (словарям). Если
+    передана дата since, выгружаются только посты и комментарии, созданные
+    не раньше неё; у сообществ и подписок даты нет, они выгружаются все.
+    """
+    model, date_field, fields = EXPORTS[kind]
+    queryset = model.objects.order_by('pk')
+    if since is not None and date_field is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    names = list(fields)
+    rows = queryset.values_list(*fields.values()).iterator(
+        chunk_size=chunk_size,
+    )
+    for row in rows:
+        yield {name: _value(value) for name, value in zip(names, row)}
+
+
+def export(directory, kinds=tuple(EXPORTS), since=None, chunk_size=2000):
+    """Функция записывает записи видов kinds в файлы <вид>.jsonl.gz в
+    каталоге directory. Возвращает словарь {вид: число записей}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    for kind in kinds:
+        path = os.path.join(directory, f'{kind}.jsonl.gz')
+        count = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as file:
+            for record in export_records(kind, since, chunk_size):
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+        counts[kind] = count
+    return counts
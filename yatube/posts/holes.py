@@ -0,0 +1,136 @@
+"""Модуль для кеширования страниц целиком, одинаковых для всех
+пользователей. Части страницы, которые зависят от пользователя (меню входа,
+кнопки подписки и редактирования, форма комментария с CSRF-токеном),
+выводятся в шаблоне тегом {% hole %} как метки <!--hole:имя:аргументы-->.
+Страница с метками сохраняется в кеш, а метки заполняет для каждого запроса
+posts.middleware.HolesMiddleware обработчиками из реестра HANDLERS.
+"""
+import hashlib
+import re
+from functools import wraps
+from urllib.parse import quote, unquote, urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import get_template, render_to_string
+
+from .forms import CommentForm
+from .models import Follow
+
+HOLE = re.compile(r'<!--hole:(?P<hole>[^>]*?)-->')
+HOLE_START = b'<!--hole:'
+PAGE_KEY_PREFIX = 'posts:page:'
+# GET-параметры, от которых зависят кешируемые страницы; остальные
+# (метки рекламных кампаний и т.п.) не создают новых записей в кеше
+PAGE_PARAMS = ('page', 'cursor', 'q')
+
+HANDLERS = {}
+
+
+def register(name):
+    """Декоратор регистрирует функцию handler(request, *args), которая
+    возвращает HTML для меток name.
+    """
+    def decorator(handler):
+        HANDLERS[name] = handler
+        return handler
+    return decorator
+
+
+def marker(name, *args):
+    """Функция возвращает метку name с аргументами args.
+    """
+    return '<!--hole:' + ':'.join(
+        quote(str(value), safe='/') for value in (name, *args)
+    ) + '-->'
+
+
+def fill_holes(html, request):
+    """Функция заменяет метки в html результатом их обработчиков для
+    запроса request. Метки без обработчика удаляются.
+    """
+    def fill(match):
+        name, *args = (
+            unquote(value) for value in match.group('hole').split(':')
+        )
+        handler = HANDLERS.get(name)
+        if handler is None:
+            return ''
+        return handler(request, *args)
+
+    return HOLE.sub(fill, html)
+
+
+@register('nav')
+def nav_user(request):
+    return render_to_string('nav_user.html', {'user': request.user})
+
+
+@register('post-edit')
+def post_edit_button(request, author_id, url):
+    if request.user.pk != int(author_id):
+        return ''
+    return get_template('posts/post_edit_button.html').render({'url': url})
+
+
+@register('follow')
+def follow_button(request, author_id, username):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user,
+        author_id=author_id,
+    ).exists()
+    return render_to_string(
+        'posts/follow_button.html',
+        {'following': following, 'username': username},
+    )
+
+
+@register('comment-form')
+def comment_form(request, username, post_id):
+    if not request.user.is_authenticated:
+        return ''
+    return render_to_string(
+        'posts/comment_form.html',
+        {'form': CommentForm(), 'username': username, 'post_id': post_id},
+        request=request,
+    )
+
+
+def cache_page_with_holes(generation_func):
+    """Декоратор кеширует ответ view-функции на GET-запрос вместе с
+    метками. Ключ кеша составляется из пути страницы, параметров
+    PAGE_PARAMS и поколения generation_func(request, *args, **kwargs),
+    которое меняется при изменении данных страницы. Если поколение равно
+    None, страница не кешируется.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            generation = generation_func(request, *args, **kwargs)
+            if generation is None:
+                return view(request, *args, **kwargs)
+            params = urlencode(
+                [
+                    (name, request.GET.getlist(name))
+                    for name in PAGE_PARAMS if name in request.GET
+                ],
+                doseq=True,
+            )
+            page = f'{request.path}?{params}|{generation}'
+            key = PAGE_KEY_PREFIX + hashlib.md5(page.encode()).hexdigest()
+            content = cache.get(key)
+            if content is not None:
+                return HttpResponse(content)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(
+                    key,
+                    response.content,
+                    settings.POSTS_PAGE_CACHE_TIMEOUT,
+                )
+            return response
+        return wrapper
+    return decorator
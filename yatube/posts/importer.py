@@ -0,0 +1,406 @@
+"""Модуль для массовой загрузки сообществ, постов, комментариев и подписок
+из файлов JSONL и CSV (команда import_content). Файл читается потоком и
+загружается частями по chunk_size записей: каждая часть записывается
+bulk_create в своей транзакции вместе с позицией в файле
+(ImportProgress), поэтому память не растёт с размером файла, а прерванная
+загрузка продолжается с первой незагруженной записи.
+
+Авторы и сообщества указываются в записях по username и slug и ищутся в
+словарях, загруженных один раз. bulk_create не вызывает сигналы, поэтому
+счётчики авторов, число комментариев постов, ленты подписок и кеш лент
+обновляются здесь же для каждой части.
+
+Поля записей:
+- groups: title, slug, description;
+- posts: id (необязательно), text, author, group, pub_date, image;
+- comments: id (необязательно), post (id поста), text, author, created;
+- follows: user, author.
+Загруженные посты добавляются в ленты подписчиков их авторов, а
+загруженные подписки - все посты автора в ленту подписчика, поэтому
+посты и подписки можно загружать в любом порядке. Сообщества загружаются
+до постов.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, stats, timeline
+from .models import Comment, Follow, Group, ImportProgress, Post
+
+User = get_user_model()
+
+KINDS = ('groups', 'posts', 'comments', 'follows')
+FORMATS = ('jsonl', 'csv')
+
+
+class ImportDataError(Exception):
+    """Ошибка в загружаемом файле, из-за которой загрузка невозможна."""
+
+
+def detect_format(path):
+    """Функция определяет формат файла path по расширению (.jsonl, .csv,
+    в том числе сжатых .gz).
+    """
+    name = path[:-len('.gz')] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lstrip('.').lower()
+    if extension == 'json':
+        extension = 'jsonl'
+    if extension not in FORMATS:
+        raise ImportDataError(f'Unknown format of {path}, use --format')
+    return extension
+
+
+@contextmanager
+def open_source(path):
+    """Функция открывает файл path для чтения текста; файлы .gz
+    распаковываются на лету, '-' означает стандартный ввод.
+    """
+    if path == '-':
+        yield sys.stdin
+        return
+    if path.endswith('.gz'):
+        stream = io.TextIOWrapper(gzip.open(path), encoding='utf-8')
+    else:
+        stream = open(path, encoding='utf-8', newline='')
+    with stream:
+        yield stream
+
+
+def read_records(stream, format_):
+    """Функция возвращает итератор по записям файла stream (словарям)."""
+    if format_ == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise ImportDataError(f'Line {number}: {error}') from error
+
+
+@contextmanager
+def preserve_dates(model):
+    """Контекстный менеджер отключает auto_now и auto_now_add полей model,
+    чтобы bulk_create сохранил даты из файла.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _date(value, now):
+    if not value:
+        return now
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'invalid date {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+def _pk(value):
+    return int(value) if value not in (None, '') else None
+
+
+class Importer:
+    """Загрузка записей вида kind (groups, posts, comments или follows) из
+    источника source частями по chunk_size записей. Пользователи, которых
+    нет в базе данных, создаются без пароля, если create_users, иначе их
+    записи пропускаются.
+    """
+
+    def __init__(self, kind, source, chunk_size=5000, create_users=False):
+        if kind not in KINDS:
+            raise ImportDataError(f'Unknown kind {kind}')
+        if len(source) > ImportProgress._meta.get_field('source').max_length:
+            raise ImportDataError(f'Source name is too long: {source}')
+        self.kind = kind
+        self.source = source
+        self.chunk_size = chunk_size
+        self.create_users = create_users
+        self.users = dict(
+            User.objects.values_list('username', 'pk').iterator()
+        )
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.imported = 0
+        self.skipped = []
+        self.skipped_count = 0
+        self.explicit_pk = False
+
+    def run(self, records):
+        """Функция загружает записи records, пропуская уже загруженные
+        ранее. Возвращает число загруженных записей.
+        """
+        progress, _ = ImportProgress.objects.get_or_create(
+            source=self.source,
+        )
+        position = progress.position
+        records = islice(records, position, None)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                after_commit = getattr(self, f'_import_{self.kind}')(
+                    chunk,
+                    position,
+                )
+                position += len(chunk)
+                ImportProgress.objects.filter(pk=progress.pk).update(
+                    position=position,
+                )
+            after_commit()
+        if self.explicit_pk:
+            self._reset_sequences()
+        return self.imported
+
+    def _skip(self, number, reason):
+        self.skipped_count += 1
+        # Храним только номера первых пропущенных записей
+        if len(self.skipped) < 100:
+            self.skipped.append((number, reason))
+
+    def _user_ids(self, usernames):
+        """Функция возвращает словарь {username: id} для usernames,
+        создавая недостающих пользователей, если это разрешено.
+        """
+        missing = {
+            name for name in usernames if name and name not in self.users
+        }
+        if missing and self.create_users:
+            User.objects.bulk_create(
+                User(username=name, password=make_password(None))
+                for name in sorted(missing)
+            )
+            self.users.update(
+                User.objects.filter(username__in=missing).values_list(
+                    'username',
+                    'pk',
+                )
+            )
+        return self.users
+
+    def _import_groups(self, chunk, position):
+        groups = {}
+        for number, record in enumerate(chunk, position + 1):
+            slug = record.get('slug')
+            if not slug:
+                self._skip(number, 'no slug')
+            elif slug in self.groups:
+                self._skip(number, 'already exists')
+            elif slug in groups:
+                self._skip(number, 'duplicate')
+            else:
+                groups[slug] = Group(
+                    title=record.get('title') or slug,
+                    slug=slug,
+                    description=record.get('description') or '',
+                )
+        Group.objects.bulk_create(groups.values())
+        self.imported += len(groups)
+        # Сообщества нужны постам, которые загружаются тем же Importer
+        self.groups.update(
+            Group.objects.filter(slug__in=groups).values_list('slug', 'pk')
+        )
+        # Новые сообщества ещё не показываются ни в одной ленте
+        return lambda: None
+
+    def _import_posts(self, chunk, position):
+        users = self._user_ids(record.get('author') for record in chunk)
+        now = timezone.now()
+        posts = []
+        for number, record in enumerate(chunk, position + 1):
+            author_id = users.get(record.get('author'))
+            group = record.get('group') or None
+            if author_id is None:
+                self._skip(number, 'unknown author')
+                continue
+            if group is not None and group not in self.groups:
+                self._skip(number, 'unknown group')
+                continue
+            try:
+                pub_date = _date(record.get('pub_date'), now)
+                pk = _pk(record.get('id'))
+            except ValueError as error:
+                self._skip(number, str(error))
+                continue
+            self.explicit_pk = self.explicit_pk or pk is not None
+            posts.append(Post(
+                pk=pk,
+                text=record.get('text') or '',
+                author_id=author_id,
+                group_id=self.groups.get(group),
+                image=record.get('image') or None,
+                pub_date=pub_date,
+                updated=pub_date,
+            ))
+        # bulk_create в SQLite не возвращает id созданных постов: новые
+        # посты без id находятся по id больше последнего до загрузки
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk',
+            flat=True,
+        ).first() or 0
+        with preserve_dates(Post):
+            Post.objects.bulk_create(posts)
+        self.imported += len(posts)
+        timeline.fan_out_posts(Post.objects.filter(
+            Q(pk__gt=last_pk)
+            | Q(pk__in=[post.pk for post in posts if post.pk is not None])
+        ))
+        authors = Counter(post.author_id for post in posts)
+        for author_id, count in authors.items():
+            stats.change(author_id, 'posts_count', count)
+        scopes = Counter(
+            scope
+            for post in posts
+            for scope in caching.post_scopes(post.group_id, post.author_id)
+        )
+
+        def after_commit():
+            for scope, count in scopes.items():
+                caching.change_count(count, scope)
+            caching.bump(*scopes)
+        return after_commit
+
+    def _import_comments(self, chunk, position):
+        users = self._user_ids(record.get('author') for record in chunk)
+        post_ids = set()
+        for record in chunk:
+            try:
+                post_ids.add(_pk(record.get('post')))
+            except ValueError:
+                pass
+        posts = {
+            post['pk']: post
+            for post in Post.objects.filter(pk__in=post_ids).values(
+                'pk',
+                'author_id',
+                'group_id',
+            )
+        }
+        now = timezone.now()
+        comments = []
+        for number, record in enumerate(chunk, position + 1):
+            author_id = users.get(record.get('author'))
+            if author_id is None:
+                self._skip(number, 'unknown author')
+                continue
+            try:
+                post_id = _pk(record.get('post'))
+                created = _date(record.get('created'), now)
+                pk = _pk(record.get('id'))
+            except ValueError as error:
+                self._skip(number, str(error))
+                continue
+            if post_id not in posts:
+                self._skip(number, 'unknown post')
+                continue
+            self.explicit_pk = self.explicit_pk or pk is not None
+            comments.append(Comment(
+                pk=pk,
+                text=record.get('text') or '',
+                post_id=post_id,
+                author_id=author_id,
+                created=created,
+            ))
+        with preserve_dates(Comment):
+            Comment.objects.bulk_create(comments)
+        self.imported += len(comments)
+        counts = Counter(comment.post_id for comment in comments)
+        for post_id, count in counts.items():
+            Post.objects.filter(pk=post_id).update(
+                comments_count=F('comments_count') + count,
+                updated=now,
+            )
+        scopes = {
+            scope
+            for post_id in counts
+            for scope in caching.post_scopes(
+                posts[post_id]['group_id'],
+                posts[post_id]['author_id'],
+            )
+        }
+        return lambda: caching.bump(*scopes)
+
+    def _import_follows(self, chunk, position):
+        users = self._user_ids(
+            name
+            for record in chunk
+            for name in (record.get('user'), record.get('author'))
+        )
+        pairs = {}
+        for number, record in enumerate(chunk, position + 1):
+            user_id = users.get(record.get('user'))
+            author_id = users.get(record.get('author'))
+            if user_id is None or author_id is None:
+                self._skip(number, 'unknown user')
+            elif user_id == author_id:
+                self._skip(number, 'self-follow')
+            elif (user_id, author_id) in pairs:
+                self._skip(number, 'duplicate')
+            else:
+                pairs[user_id, author_id] = number
+        existing = Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            author_id__in={author_id for _, author_id in pairs},
+        ).values_list('user_id', 'author_id')
+        for pair in existing:
+            if pair in pairs:
+                self._skip(pairs.pop(pair), 'already following')
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        )
+        self.imported += len(pairs)
+        followers = Counter(author_id for _, author_id in pairs)
+        following = Counter(user_id for user_id, _ in pairs)
+        for author_id, count in followers.items():
+            stats.change(author_id, 'followers_count', count)
+        for user_id, count in following.items():
+            stats.change(user_id, 'following_count', count)
+        timeline.backfill_many(pairs)
+        scopes = {
+            caching.follow_scope(user_id)
+            for user_id in {*followers, *following}
+        }
+        return lambda: caching.bump(*scopes)
+
+    def _reset_sequences(self):
+        """Функция сдвигает последовательности id после загрузки записей с
+        явными id, как это делает loaddata.
+        """
+        statements = connection.ops.sequence_reset_sql(
+            no_style(),
+            [Post, Comment],
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
@@ -0,0 +1,74 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from posts.benchmark import TIERS, VIEWS, measure_cards, run, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a fresh test database with generated content and reports '
+        'p50/p95 latency and query counts of the main pages and post card '
+        'render cost as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tier',
+            choices=list(TIERS),
+            default='small',
+            help='Amount of generated content',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Number of measured requests per page and cache state',
+        )
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            choices=VIEWS,
+            default=list(VIEWS),
+            help='Pages to measure',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed of generated content',
+        )
+        parser.add_argument(
+            '--output',
+            help='File for the JSON report, stdout by default',
+        )
+
+    def handle(self, *args, **options):
+        # Данные создаются в отдельной тестовой базе данных, которая
+        # удаляется после замеров; рабочая база данных не меняется
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            started = time.perf_counter()
+            counts = seed(TIERS[options['tier']], options['seed'])
+            seconds = time.perf_counter() - started
+            self.stderr.write(f'Seeded {counts} in {seconds:.1f} s')
+            report = {
+                'tier': options['tier'],
+                'seed': {**counts, 'seconds': round(seconds, 1)},
+                'requests': options['requests'],
+                'views': run(options['requests'], options['views']),
+                'cards': measure_cards(),
+            }
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+        result = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(result + '\n')
+        else:
+            self.stdout.write(result)
@@ -0,0 +1,60 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts.exporter import EXPORTS, export
+
+
+def _since(value):
+    date = parse_datetime(value)
+    if date is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Invalid --since date: {value}')
+        date = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports groups, posts, comments and follows to gzipped JSONL files '
+        'readable by import_content'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory for the files')
+        parser.add_argument(
+            '--since',
+            help='Export only posts and comments created at or after this '
+                 'date (YYYY-MM-DD or ISO 8601 datetime)',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=list(EXPORTS),
+            default=list(EXPORTS),
+            help='Kinds of records to export',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of rows fetched from the database at once',
+        )
+
+    def handle(self, *args, **options):
+        since = _since(options['since']) if options['since'] else None
+        counts = export(
+            options['directory'],
+            kinds=options['only'],
+            since=since,
+            chunk_size=options['chunk_size'],
+        )
+        for kind, count in counts.items():
+            self.stdout.write(
+                self.style.SUCCESS(f'Exported {count} {kind}')
+            )
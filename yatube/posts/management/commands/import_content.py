@@ -0,0 +1,70 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import (FORMATS, KINDS, Importer, ImportDataError,
+                            detect_format, open_source, read_records)
+from posts.models import ImportProgress
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads groups, posts, comments or follows from a JSONL or CSV file '
+        'in bulk. An interrupted import continues from the first record not '
+        'loaded'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument(
+            'path',
+            help='JSONL or CSV file, optionally gzipped; "-" reads stdin',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='File format, detected by extension by default',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of records loaded in one transaction',
+        )
+        parser.add_argument(
+            '--create-users',
+            action='store_true',
+            help='Create missing users instead of skipping their records',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Load the file from the beginning, ignoring saved progress',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        source = f"{options['kind']}:{os.path.abspath(path)}"
+        # Позиция в стандартном вводе не имеет смысла для следующего запуска
+        if options['restart'] or path == '-':
+            ImportProgress.objects.filter(source=source).delete()
+        try:
+            format_ = options['format'] or detect_format(path)
+            importer = Importer(
+                options['kind'],
+                source,
+                chunk_size=options['chunk_size'],
+                create_users=options['create_users'],
+            )
+            with open_source(path) as stream:
+                imported = importer.run(read_records(stream, format_))
+        except (ImportDataError, OSError) as error:
+            raise CommandError(error)
+        for number, reason in importer.skipped:
+            self.stderr.write(f'Record {number} skipped: {reason}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} {options['kind']}, "
+                f'skipped {importer.skipped_count} records'
+            )
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import recount
+
+
+class Command(BaseCommand):
+    help = 'Recalculates posts, followers and following counters of authors'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of authors recalculated in one transaction',
+        )
+
+    def handle(self, *args, **options):
+        processed = recount(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Recalculated statistics of {processed} authors'
+        ))
@@ -0,0 +1,64 @@
+import json
+import logging
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import profiling
+from .holes import HOLE_START, fill_holes
+
+logger = logging.getLogger(__name__)
+
+
+class HolesMiddleware:
+    """Заполняет метки {% hole %} в HTML-ответах для текущего пользователя.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or not response.get('Content-Type', '').startswith('text/html')
+            or HOLE_START not in response.content
+        ):
+            return response
+        response.content = fill_holes(
+            response.content.decode(response.charset),
+            request,
+        )
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует POSTS_PROFILING_SAMPLE_RATE процентов запросов: добавляет
+    в ответ заголовок Server-Timing и пишет в лог строку JSON со временем
+    запроса, числом и временем SQL-запросов, временем шаблонов и числом
+    попаданий и промахов кеша. При нулевой доле не подключается.
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.POSTS_PROFILING_SAMPLE_RATE
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        profiling.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() * 100 >= self.sample_rate:
+            return self.get_response(request)
+        with profiling.profile() as profile:
+            response = self.get_response(request)
+        response['Server-Timing'] = profile.server_timing()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **profile.as_dict(),
+        }))
+        return response
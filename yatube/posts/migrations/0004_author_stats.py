@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-17 04:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0003_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Author')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Posts count')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Followers count')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Following count')),
+            ],
+            options={
+                'verbose_name': 'Author statistics',
+                'verbose_name_plural': 'Author statistics',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-17 04:42
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_updated'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Add image here', null=True, storage=posts.storage.ContentHashStorage(), upload_to='posts/', verbose_name='Image'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-17 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Source')),
+                ('position', models.BigIntegerField(default=0, verbose_name='Records processed')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Date updated')),
+            ],
+            options={
+                'verbose_name': 'Import progress',
+                'verbose_name_plural': 'Import progress',
+            },
+        ),
+    ]
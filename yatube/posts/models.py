@@ -3,6 +3,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import post_image_storage
+
 User = get_user_model()
 
 
@@ -44,6 +46,10 @@ class Post(models.Model):
         'Date published',
         auto_now_add=True,
     )
+    updated = models.DateTimeField(
+        'Date updated',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -62,13 +68,33 @@ class Post(models.Model):
     image = models.ImageField(
         'Image',
         upload_to='posts/',
+        storage=post_image_storage,
         blank=True,
         null=True,
         help_text='Add image here',
     )
+    comments_count = models.PositiveIntegerField(
+        'Comments count',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='posts_post_date',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='posts_post_author_date',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='posts_post_group_date',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -100,6 +126,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='posts_comment_post_created',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:20]
@@ -125,5 +157,117 @@ class Follow(models.Model):
         help_text='Enter user author when you subscribe',
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='posts_follow_unique',
+            ),
+        ]
+
     def __str__(self):
         return f'{self.user.username} follow to {self.author.username}'
+
+
+class TimelineEntry(models.Model):
+    """Модель для ленты подписок пользователя.
+    Запись создаётся для каждого подписчика автора при публикации поста,
+    поэтому лента /follow/ читается по индексу (user, pub_date) без
+    объединения постов с подписками.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Reader',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Post',
+    )
+    pub_date = models.DateTimeField('Date published')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name_plural = 'Timeline entries'
+        verbose_name = 'Timeline entry'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='posts_timeline_user_date_post',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} in timeline of {self.user_id}'
+
+
+class TimelineOptOut(models.Model):
+    """Модель для авторов, посты которых не раскладываются по лентам
+    подписчиков, а добавляются в ленту /follow/ при чтении.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_opt_out',
+        verbose_name='Author',
+        help_text='Enter author with read-time timeline merging',
+    )
+
+    class Meta:
+        verbose_name_plural = 'Timeline opt-outs'
+        verbose_name = 'Timeline opt-out'
+
+    def __str__(self):
+        return f'{self.author} timeline opt-out'
+
+
+class AuthorStats(models.Model):
+    """Модель для счётчиков автора: число постов, подписчиков и подписок.
+    Счётчики обновляются вместе с созданием постов и подписок, а
+    расхождения исправляет команда recount_author_stats.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Author',
+    )
+    posts_count = models.PositiveIntegerField('Posts count', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Followers count',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'Following count',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name_plural = 'Author statistics'
+        verbose_name = 'Author statistics'
+
+    def __str__(self):
+        return f'{self.author} statistics'
+
+
+class ImportProgress(models.Model):
+    """Модель для позиции загрузки файла командой import_content: сколько
+    записей файла уже загружено. Позиция сохраняется в одной транзакции с
+    загруженными записями, поэтому прерванная загрузка продолжается без
+    пропусков и повторов.
+    """
+    source = models.CharField('Source', max_length=255, unique=True)
+    position = models.BigIntegerField('Records processed', default=0)
+    updated = models.DateTimeField('Date updated', auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Import progress'
+        verbose_name = 'Import progress'
+
+    def __str__(self):
+        return f'{self.source}: {self.position}'
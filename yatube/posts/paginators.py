@@ -0,0 +1,161 @@
+"""Модуль с паджинаторами для лент постов.
+"""
+import base64
+import binascii
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .caching import get_count
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, item, date_field='pub_date'):
+    """Функция кодирует позицию записи item в ленте (date_field, id) и
+    направление перехода в строку для GET-параметра cursor.
+    """
+    raw = f'{direction}|{getattr(item, date_field).isoformat()}|{item.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Функция раскодирует строку cursor. Возвращает кортеж
+    (направление, дата, id) или None для некорректного курсора.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage:
+    """Страница ленты, полученная по курсору. Повторяет ту часть
+    интерфейса django.core.paginator.Page, которая используется в шаблонах.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Паджинатор по ключу (date_field, id): по умолчанию для лент постов
+    (pub_date), для комментариев - created. В отличие от
+    django.core.paginator.Paginator не выполняет COUNT(*) и не использует
+    OFFSET, поэтому стоимость любой страницы одинакова.
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.date_field = date_field
+
+    def get_page(self, cursor):
+        """Функция возвращает страницу, следующую за курсором (или
+        предшествующую ему). Некорректный или пустой курсор
+        означает первую страницу.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        field = self.date_field
+        if position is None:
+            direction, queryset = NEXT, self.object_list.order_by(
+                '-' + field, '-pk'
+            )
+        else:
+            direction, date, pk = position
+            if direction == NEXT:
+                queryset = self.object_list.filter(
+                    Q(**{f'{field}__lt': date})
+                    | Q(**{field: date, 'pk__lt': pk})
+                ).order_by('-' + field, '-pk')
+            else:
+                queryset = self.object_list.filter(
+                    Q(**{f'{field}__gt': date})
+                    | Q(**{field: date, 'pk__gt': pk})
+                ).order_by(field, 'pk')
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction == PREVIOUS:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        if not items:
+            return CursorPage(items, None, None)
+        return CursorPage(
+            items,
+            encode_cursor(NEXT, items[-1], field) if has_next else None,
+            encode_cursor(PREVIOUS, items[0], field)
+            if has_previous else None,
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """Паджинатор, который берёт число постов ленты count_scope из кеша,
+    а не выполняет SELECT COUNT(*) при каждом запросе.
+    """
+
+    def __init__(self, object_list, per_page, count_scope, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_scope = count_scope
+
+    @cached_property
+    def count(self):
+        return get_count(self.count_scope, self.object_list.count)
+
+
+def page_window(number, num_pages, on_each_side=3, on_ends=1):
+    """Функция возвращает номера страниц для навигации: первые и последние
+    on_ends страниц и on_each_side страниц по обе стороны от текущей.
+    Пропущенные номера заменяются одним None; если пропущен только один
+    номер, он выводится вместо None.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    if number > on_each_side + on_ends + 2:
+        window.extend(range(1, on_ends + 1))
+        window.append(None)
+        window.extend(range(number - on_each_side, number + 1))
+    else:
+        window.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        window.extend(range(number + 1, number + on_each_side + 1))
+        window.append(None)
+        window.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window.extend(range(number + 1, num_pages + 1))
+    return window
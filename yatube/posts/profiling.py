@@ -0,0 +1,174 @@
+"""Модуль для профилирования запросов (ProfilingMiddleware): число и время
+SQL-запросов, время отрисовки шаблонов, попадания и промахи кеша.
+Запросы к базе данных считаются через connection.execute_wrapper, а
+отрисовка шаблонов и чтение кеша - через обёртки методов
+Template.render и get/get_many бэкендов кеша: документированного
+способа замерить отрисовку шаблонов вне тестов в Django нет. Обёртки
+устанавливаются один раз и, пока запрос не профилируется, только
+проверяют ContextVar; uninstall() возвращает исходные методы.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+_current = ContextVar('posts_profile', default=None)
+_MISSING = object()
+# Исходные методы, заменённые обёртками: {(класс, имя): метод}
+_originals = {}
+
+
+class Profile:
+    """Счётчики одного профилируемого запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def server_timing(self):
+        """Функция возвращает значение заголовка Server-Timing. Время
+        шаблонов включает запросы, выполненные при отрисовке.
+        """
+        return ', '.join((
+            f'db;desc="{self.db_queries} queries";'
+            f'dur={self.db_time * 1000:.1f}',
+            f'tpl;desc="templates";dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"',
+            f'total;dur={self.total * 1000:.1f}',
+        ))
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 3),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 3),
+            'template_ms': round(self.template_time * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def _profiled_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        profile = _current.get()
+        if profile is None:
+            return render(self, context)
+        # Вложенные шаблоны ({% include %}) учитываются во внешнем
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - started
+    wrapper.profiled = True
+    return wrapper
+
+
+def _profiled_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        profile = _current.get()
+        if profile is None:
+            return get(self, key, default, version)
+        value = get(self, key, _MISSING, version)
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+    wrapper.profiled = True
+    return wrapper
+
+
+def _profiled_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        profile = _current.get()
+        if profile is None:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        # BaseCache.get_many читает ключи через get: не считаем их дважды
+        token = _current.set(None)
+        try:
+            values = get_many(self, keys, version)
+        finally:
+            _current.reset(token)
+        profile.cache_hits += len(values)
+        profile.cache_misses += len(keys) - len(values)
+        return values
+    wrapper.profiled = True
+    return wrapper
+
+
+def _patch(cls, name, wrap):
+    method = getattr(cls, name)
+    if getattr(method, 'profiled', False):
+        return
+    # Унаследованный метод запоминается как _MISSING: при удалении
+    # обёртки класс снова наследует его
+    _originals[cls, name] = cls.__dict__.get(name, _MISSING)
+    setattr(cls, name, wrap(method))
+
+
+def install():
+    """Функция устанавливает обёртки отрисовки шаблонов и чтения кеша для
+    всех бэкендов из CACHES. Повторный вызов ничего не меняет.
+    """
+    _patch(Template, 'render', _profiled_render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        _patch(backend, 'get', _profiled_get)
+        _patch(backend, 'get_many', _profiled_get_many)
+
+
+def uninstall():
+    """Функция удаляет обёртки, установленные install(), и возвращает
+    исходные методы.
+    """
+    while _originals:
+        (cls, name), method = _originals.popitem()
+        if method is _MISSING:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, method)
+
+
+@contextmanager
+def profile():
+    """Контекстный менеджер профилирует код внутри себя и возвращает
+    Profile; total заполняется при выходе.
+    """
+    current = Profile()
+    token = _current.set(current)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(current.execute)
+                )
+            yield current
+    finally:
+        _current.reset(token)
+        current.total = time.perf_counter() - current.started
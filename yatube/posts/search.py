@@ -0,0 +1,112 @@
+"""Модуль полнотекстового поиска постов. В SQLite текст постов
+индексируется виртуальной таблицей FTS5 posts_post_search (см. миграцию
+0008_post_search), которую триггеры базы данных обновляют при любом
+изменении posts_post, в том числе bulk_create и update(). Результаты
+упорядочиваются по релевантности (bm25). В других СУБД пост должен
+содержать каждое слово запроса как подстроку.
+"""
+import re
+
+from functools import reduce
+from operator import and_
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'posts_post_search'
+
+WORD = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """Функция переводит строку запроса пользователя в выражение MATCH:
+    каждое слово берётся в кавычки, чтобы операторы FTS5 в запросе не
+    вызывали синтаксических ошибок. Посты должны содержать все слова.
+    Возвращает пустую строку, если слов в запросе нет.
+    """
+    return ' '.join(f'"{word}"' for word in WORD.findall(query))
+
+
+def contains_words(query):
+    """Функция возвращает условие для СУБД без FTS5: текст поста содержит
+    каждое слово запроса query.
+    """
+    return reduce(
+        and_,
+        (Q(text__icontains=word) for word in WORD.findall(query)),
+    )
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+class SearchResults:
+    """Найденные посты в порядке релевантности. Поддерживает count() и
+    срезы, поэтому передаётся в django.core.paginator.Paginator: индекс
+    FTS5 выдаёт только id постов нужной страницы, а сами посты загружаются
+    одним запросом из post_list.
+    """
+
+    def __init__(self, post_list, match):
+        self.post_list = post_list
+        self.match = match
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        limit = -1 if index.stop is None else index.stop - start
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = self.post_list.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_posts(post_list, query):
+    """Функция возвращает посты из post_list, текст которых содержит все
+    слова запроса query, начиная с самых релевантных.
+    """
+    match = match_expression(query)
+    if not match:
+        return post_list.none()
+    if not uses_fts():
+        return post_list.filter(contains_words(query))
+    return SearchResults(post_list, match)
+
+
+def filter_posts(post_list, query):
+    """Функция отбирает посты post_list, найденные по запросу query, не
+    меняя порядок queryset (например, для списка в админке).
+    """
+    match = match_expression(query)
+    if not match:
+        return post_list.none()
+    if not uses_fts():
+        return post_list.filter(contains_words(query))
+    return post_list.filter(
+        pk__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s',
+            [match],
+        )
+    )
@@ -0,0 +1,170 @@
+"""Модуль с обработчиками сигналов моделей приложения posts.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, stats, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+# Поля пользователя, которые выводятся в карточках и профайле
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def _bump_comment_post(comment):
+    """Делает недействительным кеш лент, в которых показан пост
+    комментария.
+    """
+    post = Post.objects.filter(pk=comment.post_id).values(
+        'group_id',
+        'author_id',
+    ).first()
+    if post is not None:
+        caching.bump(*caching.post_scopes(**post))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Увеличивает счётчик комментариев поста при создании комментария.
+    """
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1
+        )
+    _bump_comment_post(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Уменьшает счётчик комментариев поста при удалении комментария.
+    """
+    Post.objects.filter(
+        pk=instance.post_id,
+        comments_count__gt=0,
+    ).update(comments_count=F('comments_count') - 1)
+    _bump_comment_post(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    """Обновляет карточки и сбрасывает кеш лент с постами сообщества при
+    изменении сообщества: в карточках выводится его название.
+    """
+    if created:
+        return
+    posts = Post.objects.filter(group=instance)
+    authors = posts.order_by().values_list('author_id', flat=True).distinct()
+    caching.bump(
+        caching.INDEX,
+        caching.group_scope(instance.pk),
+        *(caching.author_scope(author_id) for author_id in authors),
+    )
+    posts.update(updated=timezone.now())
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, update_fields, **kwargs):
+    """Сбрасывает кеш страниц, на которых выводится имя пользователя,
+    при изменении его данных: профайла, лент с его постами и страниц
+    постов, которые он комментировал.
+    """
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    scopes = {caching.author_scope(instance.pk)}
+    scopes.update(
+        caching.author_scope(author_id)
+        for author_id in Post.objects.filter(
+            comments__author=instance,
+        ).order_by().values_list('author_id', flat=True).distinct()
+    )
+    groups = list(
+        Post.objects.filter(author=instance).order_by().values_list(
+            'group_id',
+            flat=True,
+        ).distinct()
+    )
+    if groups:
+        scopes.add(caching.INDEX)
+        scopes.update(
+            caching.group_scope(group_id)
+            for group_id in groups if group_id is not None
+        )
+    caching.bump(*scopes)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    """Запоминает сообщество редактируемого поста, чтобы сбросить кеш
+    сообщества, из которого пост переносится.
+    """
+    if instance.pk is None:
+        instance._previous_group_id = None
+        return
+    instance._previous_group_id = Post.objects.filter(
+        pk=instance.pk,
+    ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """Сбрасывает кеш лент поста и обновляет число постов в лентах. Для
+    нового поста увеличивает счётчик постов автора и добавляет пост в
+    ленты подписчиков автора.
+    """
+    scopes = caching.post_scopes(instance.group_id, instance.author_id)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id is not None:
+        scopes.append(caching.group_scope(previous_group_id))
+    caching.bump(*scopes)
+    if created:
+        caching.change_count(1, *scopes)
+        stats.change(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    elif previous_group_id != instance.group_id:
+        if previous_group_id is not None:
+            caching.change_count(-1, caching.group_scope(previous_group_id))
+        if instance.group_id is not None:
+            caching.change_count(1, caching.group_scope(instance.group_id))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """Уменьшает счётчик постов автора и число постов в лентах, сбрасывает
+    кеш лент поста при удалении поста.
+    """
+    scopes = caching.post_scopes(instance.group_id, instance.author_id)
+    stats.change(instance.author_id, 'posts_count', -1)
+    caching.bump(*scopes)
+    caching.change_count(-1, *scopes)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Обновляет счётчики подписок и добавляет посты автора в ленту
+    нового подписчика.
+    """
+    caching.bump(
+        caching.follow_scope(instance.author_id),
+        caching.follow_scope(instance.user_id),
+    )
+    if created:
+        stats.change(instance.author_id, 'followers_count', 1)
+        stats.change(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Обновляет счётчики подписок и удаляет посты автора из ленты
+    отписавшегося пользователя.
+    """
+    caching.bump(
+        caching.follow_scope(instance.author_id),
+        caching.follow_scope(instance.user_id),
+    )
+    stats.change(instance.author_id, 'followers_count', -1)
+    stats.change(instance.user_id, 'following_count', -1)
+    timeline.trim(instance.user_id, instance.author_id)
@@ -0,0 +1,85 @@
+"""Модуль для работы со счётчиками авторов (AuthorStats).
+Запись создаётся при первом обращении к счётчикам автора, после чего
+счётчики меняются только инкрементально.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Post
+
+User = get_user_model()
+
+COUNTERS = ('posts_count', 'followers_count', 'following_count')
+
+
+def _count(model, field, outer='pk'):
+    """Функция возвращает подзапрос с числом строк model, у которых
+    field ссылается на пользователя из поля outer внешнего запроса.
+    """
+    rows = model.objects.filter(**{field: OuterRef(outer)}).order_by().values(
+        field
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def _counted_users():
+    return User.objects.annotate(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+
+
+def get_author_stats(author):
+    """Функция возвращает счётчики автора. Если запись ещё не создана,
+    счётчики вычисляются по базе данных и сохраняются.
+    """
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        pass
+    counted = _counted_users().values(*COUNTERS).get(pk=author.pk)
+    stats, _ = AuthorStats.objects.get_or_create(
+        author=author,
+        defaults=counted,
+    )
+    return stats
+
+
+def change(author_id, counter, delta):
+    """Функция изменяет счётчик counter автора на delta. Если запись
+    счётчиков ещё не создана, ничего не делает: при первом обращении
+    счётчики будут вычислены по базе данных.
+    """
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{counter}__gte': -delta})
+    stats.update(**{counter: F(counter) + delta})
+
+
+def recount(batch_size=1000):
+    """Функция пересчитывает счётчики всех пользователей по базе данных.
+    Счётчики вычисляются подзапросами в том же UPDATE, который их
+    записывает, поэтому инкременты, сделанные во время пересчёта, не
+    теряются. Возвращает число обработанных пользователей.
+    """
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk, processed = 0, 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return processed
+        with transaction.atomic():
+            AuthorStats.objects.bulk_create(
+                (AuthorStats(author_id=pk) for pk in batch),
+                ignore_conflicts=True,
+            )
+            AuthorStats.objects.filter(author_id__in=batch).update(
+                posts_count=_count(Post, 'author', 'author_id'),
+                followers_count=_count(Follow, 'author', 'author_id'),
+                following_count=_count(Follow, 'user', 'author_id'),
+            )
+        last_pk = batch[-1]
+        processed += len(batch)
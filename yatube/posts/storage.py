@@ -0,0 +1,38 @@
+"""Модуль с хранилищем картинок постов, которое называет файлы по хешу
+содержимого. Повторно загруженная картинка (репост, редактирование поста)
+не записывается заново и получает то же имя, а значит, и готовые миниатюры.
+Содержимое файла с данным именем никогда не меняется, поэтому его адрес
+можно кешировать в браузере и CDN без ограничения срока.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Файловое хранилище, в котором имя файла - SHA-256 его содержимого
+    с исходным расширением в каталоге, заданном upload_to.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, digest.hexdigest() + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+post_image_storage = ContentHashStorage()
@@ -0,0 +1,14 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..holes import marker
+
+register = template.Library()
+
+
+@register.simple_tag
+def hole(name, *args):
+    """Выводит метку name, которую для каждого запроса заполняет
+    posts.middleware.HolesMiddleware.
+    """
+    return mark_safe(marker(name, *args))
@@ -0,0 +1,13 @@
+from django import template
+
+from ..paginators import page_window as _page_window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page):
+    """Возвращает номера страниц вокруг текущей страницы page для
+    навигации; None обозначает пропуск.
+    """
+    return _page_window(page.number, page.paginator.num_pages)
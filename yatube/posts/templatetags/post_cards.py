@@ -0,0 +1,45 @@
+import logging
+
+from django import template
+from django.utils.safestring import mark_safe
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from ..cards import render_cards
+from ..thumbnails import ThumbnailError, placeholder_ratio, ready_thumbnail
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Выводит карточки постов posts из кеша карточек.
+    """
+    return mark_safe(''.join(render_cards(list(posts))))
+
+
+@register.inclusion_tag('posts/post_thumbnail.html', takes_context=True)
+def post_thumbnail(context, image, size):
+    """Выводит варианты миниатюры size картинки поста, а пока они
+    создаются в фоне - заглушку того же размера. Миниатюры, найденные
+    заранее для всей страницы, берутся из переменной контекста thumbnails.
+    Ошибки создания миниатюры, как и в теге {% thumbnail %}, записываются
+    в журнал.
+    """
+    thumbnails = context.get('thumbnails', {})
+    if (image.name, size) in thumbnails:
+        return {'picture': thumbnails[image.name, size]}
+    try:
+        return {
+            'picture': ready_thumbnail(image, size),
+            'placeholder_ratio': placeholder_ratio(size),
+        }
+    except ThumbnailError:
+        # Ошибка уже записана в журнал при создании миниатюр
+        return {'failed': True}
+    except Exception:
+        if thumbnail_settings.THUMBNAIL_DEBUG:
+            raise
+        logger.exception('Thumbnail rendering failed for %s', image)
+        return {'failed': True}
@@ -0,0 +1,65 @@
+"""Модуль проверяет нагрузочное тестирование (posts.benchmark):
+1. база данных заполняется записями заданного объёма;
+2. для каждой страницы считаются время ответа и число SQL-запросов;
+3. замеряется время отрисовки карточки поста.
+"""
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..benchmark import VIEWS, measure_cards, run, seed
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+TINY_TIER = {
+    'users': 10,
+    'groups': 2,
+    'posts': 30,
+    'follows': 20,
+    'heavy_posts': 2,
+    'comments_per_heavy_post': 25,
+}
+
+
+class PostsBenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_benchmark_seed_and_run(self):
+        counts = seed(TINY_TIER)
+
+        self.assertEqual(
+            counts,
+            {'users': 10, 'groups': 2, 'posts': 30, 'follows': 20,
+             'comments': 50},
+        )
+        self.assertEqual(
+            (Group.objects.count(), Post.objects.count(),
+             Comment.objects.count()),
+            (2, 30, 50),
+        )
+        self.assertGreater(Follow.objects.count(), 20)
+        self.assertTrue(
+            TimelineEntry.objects.exists(),
+            'Лента подписок читателя не заполнена'
+        )
+
+        results = run(requests=2)
+
+        self.assertEqual(tuple(results), VIEWS)
+        for view, result in results.items():
+            for state in ('cold', 'warm'):
+                with self.subTest(view=view, state=state):
+                    self.assertLessEqual(
+                        result[state]['p50_ms'],
+                        result[state]['p95_ms'],
+                    )
+                    self.assertGreater(result[state]['queries'], 0)
+
+        cards = measure_cards(cards=5, repeat=2)
+
+        self.assertEqual(cards['cards'], 5)
+        self.assertLess(
+            cards['cached_us'],
+            cards['compiled_us'],
+            'Закешированные карточки отрисовываются не быстрее новых'
+        )
+        self.assertGreater(cards['include_us'], 0)
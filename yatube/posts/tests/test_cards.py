@@ -0,0 +1,160 @@
+"""Модуль проверяет кеш карточек постов (posts.cards):
+1. карточка отрисовывается один раз и затем читается из кеша;
+2. закешированная карточка не зависит от пользователя: кнопка
+редактирования выводится только автору поста;
+3. ключ карточки меняется при редактировании поста, добавлении
+комментария, изменении сообщества и имени автора;
+4. шаблон карточки загружается один раз для всей страницы карточек.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import cards
+from ..cards import card_key, render_cards
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PostsCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestCardAuthor')
+        cls.reader = User.objects.create_user(username='TestCardReader')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_card_slug',
+            description='test group description',
+        )
+        cls.post = Post.objects.create(
+            text='test card text',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_cards_rendered_once_and_cached(self):
+        """Функция проверяет, что карточка сохраняется в кеш и повторно
+        читается из него без обращения к базе данных.
+        """
+        post = Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk
+        )
+        first = render_cards([post])
+
+        self.assertIn(card_key(post), cache)
+        with self.assertNumQueries(0):
+            second = render_cards([post])
+        self.assertEqual(first, second)
+
+    def test_cards_edit_button_only_for_author(self):
+        """Функция проверяет, что одна закешированная карточка выводит
+        кнопку редактирования только автору поста.
+        """
+        edit_url = reverse(
+            'post_edit',
+            kwargs={'username': 'TestCardAuthor', 'post_id': self.post.pk}
+        )
+        clients = (
+            (self.author_client, 1),
+            (self.reader_client, 0),
+            (Client(), 0),
+        )
+
+        for client, buttons in clients:
+            with self.subTest(buttons=buttons):
+                response = client.get(reverse('index'))
+
+                self.assertContains(response, 'test card text')
+                self.assertContains(response, f'href="{edit_url}"', buttons)
+                self.assertNotContains(response, 'post-edit:')
+
+    def test_cards_key_changes_with_post(self):
+        """Функция проверяет, что ключ карточки меняется при изменении
+        поста, числа комментариев и сообщества.
+        """
+        def key():
+            return card_key(Post.objects.get(pk=self.post.pk))
+
+        keys = [key()]
+        Post.objects.get(pk=self.post.pk).save()
+        keys.append(key())
+        Comment.objects.create(
+            text='test comment',
+            post=self.post,
+            author=self.reader,
+        )
+        keys.append(key())
+        self.group.title = 'test_group_new_title'
+        self.group.save()
+        keys.append(key())
+
+        self.assertEqual(
+            len(set(keys)),
+            len(keys),
+            'Ключ карточки не меняется при изменении поста'
+        )
+
+    def test_cards_author_rename_shown_in_feed(self):
+        """Функция проверяет, что после смены имени автора лента и
+        карточка выводят новое имя, а не закешированное старое.
+        """
+        self.reader_client.get(reverse('index'))
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'TestCardRenamed'
+        author.save()
+
+        response = self.reader_client.get(reverse('index'))
+
+        self.assertContains(response, '@TestCardRenamed')
+        self.assertNotContains(response, '@TestCardAuthor')
+
+    def test_cards_commenter_rename_shown_on_post_page(self):
+        """Функция проверяет, что после смены имени комментатора без
+        постов страница поста выводит новое имя.
+        """
+        Comment.objects.create(
+            text='test comment',
+            post=self.post,
+            author=self.reader,
+        )
+        post_url = reverse('post', args=[self.author.username, self.post.pk])
+        self.reader_client.get(post_url)
+        reader = User.objects.get(pk=self.reader.pk)
+        reader.username = 'TestCardRenamedReader'
+        reader.save()
+
+        response = self.reader_client.get(post_url)
+
+        self.assertContains(response, 'TestCardRenamedReader')
+        self.assertNotContains(response, '>TestCardReader</a>')
+
+    def test_cards_template_loaded_once_per_page(self):
+        Post.objects.bulk_create(
+            Post(text=f'test card text {number}', author=self.author)
+            for number in range(3)
+        )
+        posts = list(Post.objects.select_related('author', 'group'))
+
+        with mock.patch.object(
+            cards,
+            'get_template',
+            wraps=cards.get_template,
+        ) as get_template:
+            rendered = render_cards(posts)
+
+        get_template.assert_called_once_with(cards.CARD_TEMPLATE)
+        for post, card in zip(posts, rendered):
+            self.assertIn(f'name="post_{post.pk}"', card)
+            self.assertEqual(card.count('name="post_'), 1)
@@ -0,0 +1,161 @@
+"""Модуль проверяет команду выгрузки export_content (posts.exporter):
+1. сообщества, посты, комментарии и подписки выгружаются в файлы JSONL;
+2. с параметром --since выгружаются только новые посты и комментарии;
+3. записи читаются из базы данных частями;
+4. выгруженные файлы загружаются командой import_content.
+"""
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models.query import QuerySet
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostsExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestExportAuthor')
+        cls.reader = User.objects.create_user(username='TestExportReader')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_export_slug',
+            description='test group description',
+        )
+        cls.old_post = Post.objects.create(
+            text='old post',
+            author=cls.author,
+            group=cls.group,
+        )
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=timezone.make_aware(datetime.datetime(2015, 1, 1)),
+        )
+        cls.new_post = Post.objects.create(
+            text='new post',
+            author=cls.author,
+        )
+        Comment.objects.create(
+            text='test comment',
+            post=cls.new_post,
+            author=cls.reader,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _export(self, *args):
+        call_command(
+            'export_content',
+            self.directory,
+            *args,
+            stdout=StringIO(),
+        )
+
+    def _records(self, kind):
+        path = os.path.join(self.directory, f'{kind}.jsonl.gz')
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_export_all_records(self):
+        self._export()
+
+        self.assertEqual(
+            [post['text'] for post in self._records('posts')],
+            ['old post', 'new post'],
+        )
+        self.assertEqual(
+            self._records('posts')[0]['group'],
+            'test_export_slug',
+        )
+        self.assertEqual(
+            [(comment['post'], comment['author'])
+             for comment in self._records('comments')],
+            [(self.new_post.pk, 'TestExportReader')],
+        )
+        self.assertEqual(
+            self._records('follows'),
+            [{'user': 'TestExportReader', 'author': 'TestExportAuthor'}],
+        )
+        self.assertEqual(
+            [group['slug'] for group in self._records('groups')],
+            ['test_export_slug'],
+        )
+
+    def test_export_since(self):
+        self._export('--since', '2020-01-01')
+
+        self.assertEqual(
+            [post['text'] for post in self._records('posts')],
+            ['new post'],
+            'Выгружены посты старше даты --since'
+        )
+        self.assertEqual(len(self._records('comments')), 1)
+
+    def test_export_streams_in_chunks(self):
+        """Функция проверяет, что записи не загружаются в память целиком,
+        а читаются через QuerySet.iterator().
+        """
+        with mock.patch.object(
+            QuerySet,
+            'iterator',
+            autospec=True,
+            side_effect=QuerySet.iterator,
+        ) as iterator:
+            self._export('--chunk-size', '1')
+
+        self.assertEqual(iterator.call_count, 4)
+        for call in iterator.call_args_list:
+            self.assertEqual(call[1], {'chunk_size': 1})
+
+    def test_export_import_round_trip(self):
+        """Функция проверяет, что все выгруженные виды записей загружаются
+        обратно командой import_content.
+        """
+        self._export()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+
+        for kind in ('groups', 'posts', 'comments', 'follows'):
+            call_command(
+                'import_content',
+                kind,
+                os.path.join(self.directory, f'{kind}.jsonl.gz'),
+                stdout=StringIO(),
+            )
+
+        group = Group.objects.get(slug='test_export_slug')
+        self.assertEqual(
+            (group.title, group.description),
+            ('test_group_title', 'test group description'),
+        )
+        post = Post.objects.get(pk=self.old_post.pk)
+        self.assertEqual((post.text, post.group), ('old post', group))
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(
+            Post.objects.get(pk=self.new_post.pk).comments.get().text,
+            'test comment',
+        )
+        self.assertTrue(
+            Follow.objects.filter(
+                user=self.reader,
+                author=self.author,
+            ).exists()
+        )
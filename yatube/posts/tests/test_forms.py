@@ -3,13 +3,16 @@
 отправке формы создаётся новая запись в базе данных.
 2. формы редактирования поста(страница /<username>/<post_id>/edit/):
 проверка, что при редактировании поста через форму на странице
-изменяется соответствующая запись в базе данных.
+изменяется соответствующая запись в базе данных, а счётчик комментариев,
+изменившийся во время редактирования, не перезаписывается.
 3. формы создания комментария: проверка, что только авторизированный
 пользователь может комментировать посты.
 """
 
+import hashlib
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -17,7 +20,8 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Group, Post
+from ..forms import PostForm
+from ..models import Comment, Group, Post
 
 User = get_user_model()
 
@@ -118,9 +122,12 @@ class PostsFormTests(TestCase):
                     'image': '',
                 }
                 if 'image' in form:
+                    # Картинка называется по хешу содержимого
                     expected_post = {
                         **expected_post,
-                        'image': 'posts/' + form['image'].name,
+                        'image': 'posts/' + hashlib.sha256(
+                            small_gif
+                        ).hexdigest() + '.gif',
                     }
                 post = Post.objects.get(
                     text=form['text'],
@@ -185,6 +192,49 @@ class PostsFormTests(TestCase):
             'Пост добавлен, а не изменен!'
         )
 
+    def test_forms_post_edit_keeps_comments_count(self):
+        """Функция проверяет, что комментарий, добавленный пока пост
+        редактируется, не теряется в счётчике comments_count.
+        """
+        is_valid = PostForm.is_valid
+
+        def comment_while_editing(form):
+            Comment.objects.create(
+                post=self.post,
+                author=self.author,
+                text='comment while editing',
+            )
+            return is_valid(form)
+
+        with mock.patch.object(
+            PostForm,
+            'is_valid',
+            autospec=True,
+            side_effect=comment_while_editing,
+        ):
+            self.authorized_client.post(
+                reverse(
+                    'post_edit',
+                    kwargs={
+                        'username': 'TestPostUser',
+                        'post_id': self.post.id,
+                    },
+                ),
+                data={'text': 'Edited while commented'},
+            )
+        self.post.refresh_from_db()
+
+        self.assertEqual(
+            self.post.text,
+            'Edited while commented',
+            'Изменение поста не сохранено в базе данных',
+        )
+        self.assertEqual(
+            self.post.comments_count,
+            self.post.comments.count(),
+            'Редактирование поста перезаписало счётчик комментариев',
+        )
+
     def test_forms_comments_post_only_authorized_can_comment_posts(self):
         """Функция проверяет, что только авторизированный пользователь
         может комментировать посты.
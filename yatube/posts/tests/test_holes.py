@@ -0,0 +1,174 @@
+"""Модуль проверяет кеш страниц с метками (posts.holes):
+1. страницы профайла и поста отрисовываются один раз и затем отдаются из
+кеша всем пользователям;
+2. части страницы, которые зависят от пользователя (меню входа, кнопки
+подписки и редактирования, форма комментария), заполняются для каждого
+запроса;
+3. форма комментария на закешированной странице содержит действующий
+CSRF-токен;
+4. ключ кеша страницы зависит только от параметров page, cursor и q.
+"""
+import re
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..holes import HANDLERS, PAGE_KEY_PREFIX, fill_holes, marker
+from ..models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class HoleMarkerTests(SimpleTestCase):
+    def test_holes_marker_arguments_escaped(self):
+        """Функция проверяет, что обработчик метки получает аргументы с
+        двоеточием и знаком > без искажений.
+        """
+        def handler(request, *args):
+            return '|'.join(args)
+
+        with mock.patch.dict(HANDLERS, {'test': handler}):
+            html = fill_holes(
+                'a ' + marker('test', 'b:c', '<d>', '/e/') + ' f',
+                None,
+            )
+
+        self.assertEqual(html, 'a b:c|<d>|/e/ f')
+
+
+class PostsPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestHoleAuthor')
+        cls.reader = User.objects.create_user(username='TestHoleReader')
+        cls.post = Post.objects.create(
+            text='test post text',
+            author=cls.author,
+        )
+        cls.profile_url = reverse(
+            'profile',
+            kwargs={'username': 'TestHoleAuthor'}
+        )
+        cls.post_url = reverse(
+            'post',
+            kwargs={'username': 'TestHoleAuthor', 'post_id': cls.post.pk}
+        )
+        cls.edit_url = reverse(
+            'post_edit',
+            kwargs={'username': 'TestHoleAuthor', 'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_holes_page_rendered_once(self):
+        """Функция проверяет, что страница отрисовывается только для
+        первого пользователя, а остальным отдаётся из кеша.
+        """
+        pages = (
+            (self.profile_url, 'posts/profile.html'),
+            (self.post_url, 'posts/post.html'),
+        )
+
+        for page, template in pages:
+            with self.subTest(page=page):
+                first = self.author_client.get(page)
+                second = self.reader_client.get(page)
+
+                self.assertTemplateUsed(first, template)
+                self.assertTemplateNotUsed(
+                    second,
+                    template,
+                    f'Страница {page} не читается из кеша'
+                )
+                self.assertContains(second, 'test post text')
+
+    def test_holes_page_key_ignores_other_params(self):
+        """Функция проверяет, что посторонние GET-параметры не создают
+        новых записей в кеше, а параметры страницы - создают.
+        """
+        self.author_client.get(self.profile_url)
+
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            response = self.reader_client.get(
+                self.profile_url + '?utm_source=test&ref=1'
+            )
+            self.reader_client.get(self.profile_url + '?page=1')
+        pages = [
+            call for call in cache_set.call_args_list
+            if call[0][0].startswith(PAGE_KEY_PREFIX)
+        ]
+
+        self.assertContains(response, 'test post text')
+        self.assertEqual(
+            len(pages),
+            1,
+            'Ключ кеша страницы зависит от посторонних GET-параметров'
+        )
+
+    def test_holes_filled_for_each_viewer(self):
+        """Функция проверяет, что одна закешированная страница выводит
+        каждому пользователю его меню, кнопки и форму комментария.
+        """
+        self.author_client.get(self.post_url)
+        author = self.author_client.get(self.post_url)
+        reader = self.reader_client.get(self.post_url)
+        guest = self.guest_client.get(self.post_url)
+
+        self.assertContains(author, 'User: TestHoleAuthor')
+        self.assertContains(author, f'href="{self.edit_url}"')
+        self.assertContains(reader, 'User: TestHoleReader')
+        self.assertNotContains(reader, f'href="{self.edit_url}"')
+        self.assertContains(reader, 'Subscribe')
+        self.assertContains(reader, 'Create comment')
+        self.assertContains(guest, 'Registration')
+        self.assertNotContains(guest, 'Create comment')
+        for response in (author, reader, guest):
+            self.assertNotContains(response, '<!--hole:')
+
+    def test_holes_follow_button_changes(self):
+        self.reader_client.get(self.profile_url)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        response = self.reader_client.get(self.profile_url)
+
+        self.assertContains(response, 'Unsubscribe')
+        self.assertContains(response, 'Subscribers: 1')
+
+    def test_holes_comment_form_csrf_token(self):
+        """Функция проверяет, что комментарий отправляется формой со
+        страницы, прочитанной из кеша.
+        """
+        self.author_client.get(self.post_url)
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reader)
+        response = client.get(self.post_url)
+        token = re.search(
+            r'name="csrfmiddlewaretoken" value="(\w+)"',
+            response.content.decode(),
+        )
+
+        self.assertTemplateNotUsed(response, 'posts/post.html')
+        self.assertIsNotNone(token, 'Форма комментария без CSRF-токена')
+        response = client.post(
+            reverse(
+                'add_comment',
+                kwargs={'username': 'TestHoleAuthor', 'post_id': self.post.pk}
+            ),
+            {
+                'text': 'test comment',
+                'csrfmiddlewaretoken': token.group(1),
+            },
+        )
+
+        self.assertRedirects(response, self.post_url)
+        self.assertTrue(Comment.objects.filter(text='test comment').exists())
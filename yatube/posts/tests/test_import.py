@@ -0,0 +1,272 @@
+"""Модуль проверяет команду массовой загрузки import_content
+(posts.importer):
+1. сообщества, посты, комментарии и подписки загружаются из JSONL и CSV
+с датами из файла, авторы и сообщества находятся по username и slug;
+2. счётчики авторов, число комментариев постов и ленты подписок
+обновляются, как при создании записей через модели: загруженные посты
+попадают в ленты подписчиков, а ленты для загруженных подписок
+заполняются общими запросами для всей части;
+3. записи с неизвестными авторами и сообществами пропускаются;
+4. прерванная загрузка продолжается с первой незагруженной записи.
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .. import importer
+from ..models import (AuthorStats, Follow, Group, Post, TimelineEntry,
+                      TimelineOptOut)
+from ..stats import get_author_stats
+
+User = get_user_model()
+
+
+class PostsImportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestImportAuthor')
+        cls.reader = User.objects.create_user(username='TestImportReader')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_import_slug',
+            description='test group description',
+        )
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def _jsonl(self, name, records):
+        return self._write(
+            name,
+            ''.join(json.dumps(record) + '\n' for record in records),
+        )
+
+    def _import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_content', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_posts_comments_follows(self):
+        """Функция проверяет загрузку постов, комментариев и подписок и
+        обновление связанных с ними счётчиков и лент.
+        """
+        get_author_stats(self.author)
+        get_author_stats(self.reader)
+        posts = self._jsonl('posts.jsonl.gz', [
+            {
+                'id': 1000 + number,
+                'text': f'imported post {number}',
+                'author': 'TestImportAuthor',
+                'group': 'test_import_slug',
+                'pub_date': f'2015-01-0{number + 1}T10:00:00+00:00',
+            }
+            for number in range(3)
+        ])
+        comments = self._write(
+            'comments.csv',
+            'post,author,text,created\n'
+            '1000,TestImportReader,first,2015-02-01T10:00:00\n'
+            '1000,TestImportReader,second,2015-02-02T10:00:00\n',
+        )
+        follows = self._jsonl('follows.jsonl', [
+            {'user': 'TestImportReader', 'author': 'TestImportAuthor'},
+        ])
+
+        self._import('posts', posts)
+        self._import('comments', comments)
+        self._import('follows', follows)
+
+        post = Post.objects.get(pk=1000)
+        self.assertEqual(
+            (post.text, post.group, post.pub_date.year),
+            ('imported post 0', self.group, 2015),
+            'Пост загружен неверно'
+        )
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(
+            list(post.comments.values_list('text', 'created__year')),
+            [('second', 2015), ('first', 2015)],
+        )
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (3, 1))
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.reader).following_count,
+            1,
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(),
+            3,
+            'Посты автора не добавлены в ленту подписчика'
+        )
+        new_post = Post.objects.create(text='new', author=self.author)
+        self.assertGreater(new_post.pk, 1002)
+
+    def test_import_posts_fan_out_to_followers(self):
+        """Функция проверяет, что загруженные посты с id и без id попадают
+        в ленты подписчиков автора, кроме постов авторов, для которых
+        лента собирается при чтении.
+        """
+        large = User.objects.create_user(username='TestImportLarge')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=large)
+        TimelineOptOut.objects.create(author=large)
+        path = self._jsonl('fan_out.jsonl', [
+            {'id': 2000, 'text': 'with id', 'author': 'TestImportAuthor'},
+            {'text': 'without id', 'author': 'TestImportAuthor'},
+            {'text': 'large author', 'author': 'TestImportLarge'},
+        ])
+
+        self._import('posts', path)
+
+        self.assertCountEqual(
+            TimelineEntry.objects.filter(user=self.reader).values_list(
+                'post__text',
+                flat=True,
+            ),
+            ['with id', 'without id'],
+            'Загруженные посты не добавлены в ленту подписчика'
+        )
+
+    def test_import_follows_backfill_batched(self):
+        """Функция проверяет, что ленты для всех подписок части
+        заполняются одним чтением постов, а не запросом на каждую
+        подписку.
+        """
+        authors = [
+            User.objects.create_user(username=f'TestImportBatch{number}')
+            for number in range(3)
+        ]
+        for author in authors:
+            Post.objects.create(text='batched post', author=author)
+        path = self._jsonl('batched.jsonl', [
+            {'user': 'TestImportReader', 'author': author.username}
+            for author in authors
+        ])
+
+        with CaptureQueriesContext(connection) as captured:
+            self._import('follows', path)
+
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(),
+            3,
+        )
+        self.assertEqual(
+            len([
+                query for query in captured
+                if query['sql'].startswith('SELECT')
+                and 'FROM "posts_post"' in query['sql']
+            ]),
+            1,
+            'Ленты подписок заполняются отдельным запросом на подписку'
+        )
+
+    def test_import_unknown_references_skipped(self):
+        path = self._jsonl('bad.jsonl', [
+            {'text': 'ok', 'author': 'TestImportAuthor'},
+            {'text': 'no author', 'author': 'TestImportNobody'},
+            {'text': 'no group', 'author': 'TestImportAuthor',
+             'group': 'nobody'},
+        ])
+
+        out, err = self._import('posts', path)
+
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['ok'],
+        )
+        self.assertIn('Record 2 skipped: unknown author', err)
+        self.assertIn('Record 3 skipped: unknown group', err)
+        self.assertIn('Imported 1 posts, skipped 2 records', out)
+
+    def test_import_groups(self):
+        """Функция проверяет загрузку сообществ: существующие и повторные
+        slug пропускаются.
+        """
+        path = self._write(
+            'groups.csv',
+            'title,slug,description\n'
+            'New group,test_import_new,new description\n'
+            'Same slug,test_import_slug,other description\n'
+            'Again,test_import_new,again\n',
+        )
+
+        out, err = self._import('groups', path)
+
+        group = Group.objects.get(slug='test_import_new')
+        self.assertEqual(
+            (group.title, group.description),
+            ('New group', 'new description'),
+        )
+        self.assertEqual(
+            Group.objects.get(slug='test_import_slug').title,
+            'test_group_title',
+        )
+        self.assertIn('Record 2 skipped: already exists', err)
+        self.assertIn('Record 3 skipped: duplicate', err)
+        self.assertIn('Imported 1 groups, skipped 2 records', out)
+
+    def test_import_create_users(self):
+        path = self._jsonl('users.jsonl', [
+            {'text': 'text', 'author': 'TestImportNewcomer'},
+        ])
+
+        self._import('posts', path, '--create-users')
+
+        newcomer = User.objects.get(username='TestImportNewcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertTrue(Post.objects.filter(author=newcomer).exists())
+
+    def test_import_resumes_after_failure(self):
+        """Функция проверяет, что после ошибки в части записей повторный
+        запуск загружает только незагруженные записи.
+        """
+        path = self._jsonl('resume.jsonl', [
+            {'text': f'text {number}', 'author': 'TestImportAuthor'}
+            for number in range(5)
+        ])
+        original = importer.Importer._import_posts
+        calls = []
+
+        def fail_on_second_chunk(self, chunk, position):
+            calls.append(position)
+            if len(calls) == 2:
+                raise RuntimeError('Connection lost')
+            return original(self, chunk, position)
+
+        with mock.patch.object(
+            importer.Importer,
+            '_import_posts',
+            fail_on_second_chunk,
+        ), self.assertRaises(RuntimeError):
+            self._import('posts', path, '--chunk-size', '2')
+        self.assertEqual(Post.objects.count(), 2)
+
+        self._import('posts', path, '--chunk-size', '2')
+        self._import('posts', path, '--chunk-size', '2')
+
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'text {number}' for number in range(5)],
+            'Записи загружены с пропусками или повторно'
+        )
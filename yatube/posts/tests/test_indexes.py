@@ -0,0 +1,115 @@
+"""Модуль проверяет, что основные запросы страниц приложения Posts
+выполняются по индексам: план запроса (EXPLAIN QUERY PLAN) не содержит
+полного просмотра таблицы без индекса и сортировки во временном B-дереве.
+Проверяются запросы:
+- ленты главной страницы, страницы группы, профайла и подписок (в том
+числе с постами авторов, добавляемыми в ленту при чтении),
+- комментариев к посту,
+- проверки подписки пользователя на автора.
+"""
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment, Follow, Group, Post, TimelineOptOut
+from ..timeline import timeline_posts
+from ..views import POSTS_PER_PAGE, _feed_posts
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class PostsQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestPlanAuthor')
+        cls.reader = User.objects.create_user(username='TestPlanReader')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_plan_slug',
+            description='test group description',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='test post text',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def _query_plan(self, queryset):
+        return self._sql_plan(*queryset.query.sql_with_params())
+
+    def _sql_plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def _assert_uses_index(self, name, queryset):
+        plan = self._query_plan(queryset)
+
+        self.assertFalse(
+            [step for step in plan if 'TEMP B-TREE' in step],
+            f'Запрос "{name}" сортируется без индекса: {plan}'
+        )
+        self.assertFalse(
+            [
+                step for step in plan
+                if step.startswith('SCAN') and 'INDEX' not in step
+            ],
+            f'Запрос "{name}" просматривает таблицу без индекса: {plan}'
+        )
+
+    def test_indexes_main_queries_use_index(self):
+        """Функция проверяет, что основные запросы страниц не просматривают
+        таблицы целиком и не сортируют результат во временном B-дереве.
+        """
+        queries = (
+            ('index', _feed_posts()[:POSTS_PER_PAGE]),
+            ('group_posts', _feed_posts(group=self.group)[:POSTS_PER_PAGE]),
+            ('profile', _feed_posts(author=self.author)[:POSTS_PER_PAGE]),
+            (
+                'follow_index',
+                timeline_posts(_feed_posts(), self.reader)[:POSTS_PER_PAGE],
+            ),
+            ('comments', Comment.objects.filter(post=self.post)),
+            (
+                'follow exists',
+                Follow.objects.filter(
+                    user=self.reader,
+                    author=self.author,
+                ).values('pk')[:1],
+            ),
+        )
+
+        for name, queryset in queries:
+            with self.subTest(name=name):
+                self._assert_uses_index(name, queryset)
+
+    def test_indexes_merged_timeline_uses_index(self):
+        """Функция проверяет, что страница ленты подписок с постами
+        авторов, добавляемыми при чтении (TimelineOptOut), читается только
+        поиском по диапазонам индексов (SEARCH): просмотр индекса всех
+        постов (SCAN) стоит столько же, сколько вся таблица постов.
+        """
+        large_author = User.objects.create_user(username='TestPlanLarge')
+        Follow.objects.create(user=self.reader, author=large_author)
+        TimelineOptOut.objects.create(author=large_author)
+        timeline = timeline_posts(_feed_posts(), self.reader)
+
+        with CaptureQueriesContext(connection) as context:
+            timeline[:POSTS_PER_PAGE]
+
+        for query in context.captured_queries:
+            plan = self._sql_plan(query['sql'])
+            with self.subTest(sql=query['sql']):
+                self.assertFalse(
+                    [
+                        step for step in plan
+                        if step.startswith('SCAN') or 'TEMP B-TREE' in step
+                    ],
+                    f'Лента подписок читается не по диапазону индекса: {plan}'
+                )
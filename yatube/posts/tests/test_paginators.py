@@ -0,0 +1,256 @@
+"""Модуль проверяет работу паджинаторов лент постов:
+1. проход по ленте вперёд и назад возвращает все посты без пропусков и
+повторов, в том числе для постов с одинаковой датой публикации;
+2. получение страницы по курсору (pub_date, id) выполняется одним
+запросом без COUNT(*);
+3. некорректный курсор возвращает первую страницу;
+4. ленты index, group_posts, profile и follow_index поддерживают
+параметр ?cursor=.
+5. навигация по страницам выводит только окно страниц вокруг текущей,
+поэтому её размер не зависит от числа страниц, а список всех страниц
+не перебирается.
+6. число постов ленты берётся из кеша, меняется при создании и удалении
+постов и периодически сверяется с базой данных.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.template.loader import get_template
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import caching
+from ..models import Follow, Group, Post
+from ..paginators import (CachedCountPaginator, CursorPage, CursorPaginator,
+                          page_window)
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestCursorAuthor')
+        cls.reader = User.objects.create_user(username='TestCursorReader')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_cursor_slug',
+            description='test group description',
+        )
+        Post.objects.bulk_create(
+            [
+                Post(
+                    text='test text ' + str(number),
+                    author=cls.author,
+                    group=cls.group,
+                )
+                for number in range(25)
+            ]
+        )
+        # Часть постов получает одинаковую дату публикации, чтобы
+        # проверить разрешение совпадений по id.
+        Post.objects.filter(
+            pk__in=Post.objects.order_by('pk').values('pk')[5:12]
+        ).update(pub_date=timezone.now())
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def _walk_forward(self, paginator):
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def test_cursor_paginator_walks_feed_forward_and_back(self):
+        """Функция проверяет, что проход по курсорам вперёд и назад
+        возвращает посты в порядке (-pub_date, -id) без пропусков.
+        """
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        pages = self._walk_forward(paginator)
+        walked = [post for page in pages for post in page]
+
+        self.assertEqual(
+            walked,
+            self.expected,
+            'Проход по курсорам пропускает или повторяет посты'
+        )
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(
+            list(previous),
+            self.expected[10:20],
+            'Переход на предыдущую страницу работает некорректно'
+        )
+        self.assertTrue(previous.has_next())
+        first = paginator.get_page(previous.previous_cursor)
+        self.assertEqual(list(first), self.expected[:10])
+        self.assertFalse(first.has_previous())
+
+    def test_cursor_paginator_page_costs_one_query(self):
+        """Функция проверяет, что страница по курсору получается одним
+        запросом без подсчёта числа постов.
+        """
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        cursor = paginator.get_page(None).next_cursor
+
+        with self.assertNumQueries(1):
+            page = paginator.get_page(cursor)
+            list(page)
+
+    def test_cursor_paginator_invalid_cursor_returns_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+
+        for cursor in ('', 'not-a-cursor', '!!!'):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+
+                self.assertEqual(list(page), self.expected[:10])
+
+    def test_cursor_pagination_in_feeds(self):
+        """Функция проверяет, что ленты поддерживают параметр ?cursor=.
+        """
+        feeds = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test_cursor_slug'}),
+            reverse('profile', kwargs={'username': 'TestCursorAuthor'}),
+            reverse('follow_index'),
+        )
+
+        for feed in feeds:
+            with self.subTest(feed=feed):
+                response = self.reader_client.get(feed + '?cursor=')
+                page = response.context['page']
+                second = self.reader_client.get(
+                    feed + '?cursor=' + page.next_cursor
+                ).context['page']
+
+                self.assertIsInstance(page, CursorPage)
+                self.assertEqual(list(page), self.expected[:10])
+                self.assertEqual(list(second), self.expected[10:20])
+                self.assertContains(
+                    response,
+                    '?cursor=' + page.next_cursor
+                )
+
+
+@override_settings(POSTS_EXACT_COUNT_LIMIT=0)
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestCountAuthor')
+        Post.objects.bulk_create(
+            Post(text='test text ' + str(number), author=cls.author)
+            for number in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def _count(self):
+        return CachedCountPaginator(
+            Post.objects.all(),
+            10,
+            caching.INDEX,
+        ).count
+
+    def test_cached_count_maintained_by_signals(self):
+        """Функция проверяет, что число постов подсчитывается один раз,
+        а затем меняется при создании и удалении постов без запросов
+        COUNT(*).
+        """
+        self.assertEqual(self._count(), 5)
+
+        post = Post.objects.create(text='test new post', author=self.author)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._count(), 6)
+
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._count(), 5)
+
+    def test_cached_count_reconciled(self):
+        """Функция проверяет, что расхождение числа постов исправляется
+        при очередной сверке с базой данных.
+        """
+        self._count()
+        caching.change_count(100, caching.INDEX)
+
+        self.assertEqual(self._count(), 105)
+
+        cache.delete(
+            caching.COUNT_PREFIX + caching.INDEX + caching.CHECKED_SUFFIX
+        )
+
+        self.assertEqual(self._count(), 5)
+
+    @override_settings(POSTS_EXACT_COUNT_LIMIT=10)
+    def test_cached_count_exact_for_small_feeds(self):
+        self._count()
+        caching.change_count(1, caching.INDEX)
+
+        self.assertEqual(self._count(), 5)
+
+
+class PageWindowTests(SimpleTestCase):
+    def test_page_window_numbers(self):
+        cases = (
+            ((1, 5), [1, 2, 3, 4, 5]),
+            ((1, 20000), [1, 2, 3, 4, None, 20000]),
+            ((5, 20000), [1, 2, 3, 4, 5, 6, 7, 8, None, 20000]),
+            ((6, 20000), [1, 2, 3, 4, 5, 6, 7, 8, 9, None, 20000]),
+            ((7, 20000), [1, None, 4, 5, 6, 7, 8, 9, 10, None, 20000]),
+            ((19995, 20000), [1, None, 19992, 19993, 19994, 19995, 19996,
+                              19997, 19998, 19999, 20000]),
+            ((500, 20000), [1, None, 497, 498, 499, 500, 501, 502, 503,
+                            None, 20000]),
+            ((20000, 20000), [1, None, 19997, 19998, 19999, 20000]),
+        )
+
+        for (number, num_pages), expected in cases:
+            with self.subTest(number=number, num_pages=num_pages):
+                self.assertEqual(page_window(number, num_pages), expected)
+
+    def _render(self, num_pages):
+        """Функция возвращает HTML навигации по средней странице ленты из
+        num_pages страниц и признак того, что при отрисовке перебирался
+        список всех страниц (Paginator.page_range).
+        """
+        paginator = Paginator(range(num_pages * 10), 10)
+        page = paginator.page(num_pages // 2)
+        navigation = get_template('paginator.html')
+        with mock.patch.object(
+            Paginator,
+            'page_range',
+            new_callable=mock.PropertyMock,
+        ) as page_range:
+            html = navigation.render({'page': page})
+        return html, page_range.called
+
+    def test_page_window_render_independent_of_page_count(self):
+        """Функция сравнивает навигацию для 20 и 20000 страниц: число
+        ссылок одинаково, и список всех страниц не перебирается.
+        """
+        small_html, small_range_used = self._render(20)
+        large_html, large_range_used = self._render(20000)
+
+        self.assertEqual(
+            small_html.count('<li'),
+            large_html.count('<li'),
+            'Число ссылок навигации зависит от числа страниц'
+        )
+        self.assertFalse(
+            small_range_used or large_range_used,
+            'Навигация перебирает номера всех страниц'
+        )
@@ -0,0 +1,118 @@
+"""Модуль проверяет профилирование запросов (ProfilingMiddleware):
+1. пока профилирование выключено, заголовка Server-Timing нет;
+2. профилируемый ответ содержит Server-Timing с числом и временем
+SQL-запросов, временем шаблонов и попаданиями в кеш, а в лог пишется
+строка JSON с теми же значениями;
+3. профилируется заданная доля запросов;
+4. обёртки шаблонов и кеша удаляются без следа.
+"""
+import json
+import re
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.template.base import Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import middleware, profiling
+from ..models import Post
+
+User = get_user_model()
+
+
+class PostsProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestProfileAuthor')
+        Post.objects.create(text='test profile text', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        # Обёртки, установленные middleware, не должны оставаться после
+        # теста
+        self.addCleanup(profiling.uninstall)
+
+    def test_profiling_disabled_by_default(self):
+        response = Client().get(reverse('index'))
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(POSTS_PROFILING_SAMPLE_RATE=100)
+    def test_profiling_server_timing_and_log(self):
+        """Функция проверяет заголовок Server-Timing и строку лога
+        профилируемого запроса.
+        """
+        client = Client()
+        with CaptureQueriesContext(connection) as queries, \
+                self.assertLogs('posts.middleware', 'INFO') as logs:
+            response = client.get(reverse('index'))
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;desc="\d+ queries";dur=[\d.]+')
+        self.assertRegex(timing, r'tpl;desc="templates";dur=[\d.]+')
+        self.assertRegex(timing, r'cache;desc="\d+ hits \d+ misses"')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+        profile = json.loads(logs.records[0].getMessage())
+        self.assertEqual(profile['path'], reverse('index'))
+        self.assertEqual(profile['status'], 200)
+        self.assertEqual(profile['db_queries'], len(queries))
+        self.assertGreater(profile['template_ms'], 0)
+        self.assertGreater(profile['cache_misses'], 0)
+
+        response = client.get(reverse('index'))
+
+        hits = re.search(r'(\d+) hits', response['Server-Timing'])
+        self.assertGreater(
+            int(hits.group(1)),
+            0,
+            'Повторный запрос не читает кеш'
+        )
+
+    @override_settings(POSTS_PROFILING_SAMPLE_RATE=10)
+    def test_profiling_sample_rate(self):
+        client = Client()
+        with mock.patch.object(middleware.random, 'random', return_value=0.5):
+            skipped = client.get(reverse('index'))
+        with mock.patch.object(middleware.random, 'random', return_value=0.05):
+            sampled = client.get(reverse('index'))
+
+        self.assertFalse(skipped.has_header('Server-Timing'))
+        self.assertTrue(sampled.has_header('Server-Timing'))
+
+    def test_profiling_uninstall_restores_methods(self):
+        """Функция проверяет, что uninstall() возвращает исходные методы
+        отрисовки шаблонов и чтения кеша, в том числе унаследованные.
+        """
+        backend = type(caches['default'])
+        methods = (
+            (Template, 'render'),
+            (backend, 'get'),
+            (backend, 'get_many'),
+        )
+        before = {
+            (cls, name): (getattr(cls, name), name in cls.__dict__)
+            for cls, name in methods
+        }
+
+        profiling.install()
+        profiling.install()
+
+        for cls, name in methods:
+            with self.subTest(cls=cls, name=name):
+                self.assertTrue(getattr(cls, name).profiled)
+
+        profiling.uninstall()
+
+        for cls, name in methods:
+            with self.subTest(cls=cls, name=name):
+                self.assertEqual(
+                    (getattr(cls, name), name in cls.__dict__),
+                    before[cls, name],
+                    'uninstall() не вернул исходный метод'
+                )
+        self.assertEqual(Client().get(reverse('index')).status_code, 200)
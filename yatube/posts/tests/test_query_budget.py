@@ -0,0 +1,188 @@
+"""Модуль проверяет бюджет SQL-запросов страниц приложения posts:
+1. для каждого адреса из posts/urls.py задано наибольшее число запросов
+(QUERY_BUDGETS), а новый адрес без бюджета не проходит проверку;
+2. число запросов на каждый адрес не превышает бюджета при пустом кеше;
+3. число запросов не растёт с числом постов и комментариев на странице:
+страницы запрашиваются при разном объёме данных, и число запросов не
+должно быть больше, чем при одной записи.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..urls import urlpatterns
+from ..views import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+
+User = get_user_model()
+
+# Наибольшее число SQL-запросов на адрес для авторизованного пользователя
+# при пустом кеше
+QUERY_BUDGETS = {
+    'index': 4,
+    'group_posts': 6,
+    'new_post': 3,
+    'follow_index': 5,
+    'search': 5,
+    'profile': 7,
+    'post': 6,
+    'add_comment': 7,
+    'post_comments': 2,
+    'post_edit': 5,
+    'profile_follow': 12,
+    'profile_unfollow': 11,
+}
+
+# Объём данных: одна запись, полная страница, больше двух страниц
+DATA_SIZES = (1, POSTS_PER_PAGE, COMMENTS_PER_PAGE + 1)
+
+
+class PostsQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestBudgetAuthor')
+        cls.reader = User.objects.create_user(username='TestBudgetReader')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_budget_slug',
+            description='test group description',
+        )
+        cls.post = Post.objects.create(
+            text='test budget post',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.created = 0
+
+    def _grow(self, size):
+        """Функция доводит число постов автора и комментариев к посту
+        self.post до size; у каждого комментария свой автор.
+        """
+        for number in range(self.created, size):
+            commenter = User.objects.create_user(
+                username=f'TestBudgetCommenter{number}'
+            )
+            post = Post.objects.create(
+                text=f'test budget post {number}',
+                author=self.author,
+                group=self.group,
+            )
+            for commented in (post, self.post):
+                Comment.objects.create(
+                    text='test comment',
+                    post=commented,
+                    author=commenter,
+                )
+        self.created = size
+
+    def _requests(self):
+        """Функция возвращает запрос для каждого адреса: клиент, метод,
+        адрес и данные формы.
+        """
+        author = {'username': 'TestBudgetAuthor'}
+        post = {**author, 'post_id': self.post.pk}
+        reader = self.reader_client
+        return {
+            'index': (reader, 'get', reverse('index'), {}),
+            'group_posts': (
+                reader,
+                'get',
+                reverse('group_posts', kwargs={'slug': 'test_budget_slug'}),
+                {},
+            ),
+            'new_post': (reader, 'get', reverse('new_post'), {}),
+            'follow_index': (reader, 'get', reverse('follow_index'), {}),
+            'search': (reader, 'get', reverse('search'), {'q': 'budget'}),
+            'profile': (reader, 'get', reverse('profile', kwargs=author), {}),
+            'post': (reader, 'get', reverse('post', kwargs=post), {}),
+            'add_comment': (
+                reader,
+                'post',
+                reverse('add_comment', kwargs=post),
+                {'text': 'test budget comment'},
+            ),
+            'post_comments': (
+                reader,
+                'get',
+                reverse('post_comments', kwargs=post),
+                {},
+            ),
+            'post_edit': (
+                self.author_client,
+                'get',
+                reverse('post_edit', kwargs=post),
+                {},
+            ),
+            'profile_follow': (
+                reader,
+                'get',
+                reverse('profile_follow', kwargs=author),
+                {},
+            ),
+            'profile_unfollow': (
+                reader,
+                'get',
+                reverse('profile_unfollow', kwargs=author),
+                {},
+            ),
+        }
+
+    def _count_queries(self, name, client, method, url, data):
+        # Первый запрос создаёт счётчики автора, считаем запросы
+        # для повторного обращения к странице
+        getattr(client, method)(url, data)
+        if name == 'profile_follow':
+            Follow.objects.filter(user=self.reader).delete()
+        elif name == 'profile_unfollow':
+            Follow.objects.get_or_create(user=self.reader, author=self.author)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(url, data)
+        self.assertLess(response.status_code, 400, url)
+        return len(queries)
+
+    def test_query_budget_declared_for_every_url(self):
+        names = {pattern.name for pattern in urlpatterns}
+
+        self.assertEqual(
+            names - set(QUERY_BUDGETS),
+            set(),
+            'Для адресов не задан бюджет SQL-запросов в QUERY_BUDGETS'
+        )
+
+    def test_query_budget_not_exceeded_and_flat(self):
+        """Функция проверяет, что число запросов на каждый адрес не
+        превышает бюджета и не растёт с объёмом данных.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        counts = {}
+        for size in DATA_SIZES:
+            self._grow(size)
+            for name, request in self._requests().items():
+                counts.setdefault(name, []).append(
+                    self._count_queries(name, *request)
+                )
+
+        for name, queries in counts.items():
+            with self.subTest(name=name):
+                self.assertLessEqual(
+                    max(queries),
+                    QUERY_BUDGETS[name],
+                    f'Адрес {name} превышает бюджет SQL-запросов: {queries}'
+                )
+                self.assertLessEqual(
+                    max(queries),
+                    queries[0],
+                    f'Число SQL-запросов адреса {name} растёт с объёмом '
+                    f'данных {DATA_SIZES}: {queries}'
+                )
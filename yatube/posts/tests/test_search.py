@@ -0,0 +1,148 @@
+"""Модуль проверяет полнотекстовый поиск постов (posts.search):
+1. поиск находит посты, содержащие все слова запроса, начиная с самых
+релевантных;
+2. индекс обновляется при создании, изменении и удалении постов, в том
+числе массовыми операциями;
+3. операторы FTS5 в запросе пользователя не вызывают ошибок;
+4. результаты поиска выводятся постранично с сохранением запроса;
+5. поиск в административном интерфейсе использует индекс;
+6. без FTS5 посты должны содержать каждое слово запроса, а не всю строку.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+from ..views import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class PostsSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestSearchAuthor')
+        cls.rare = Post.objects.create(
+            text='Кошка спит на диване',
+            author=cls.author,
+        )
+        cls.frequent = Post.objects.create(
+            text='Кошка, кошка и ещё раз кошка на диване',
+            author=cls.author,
+        )
+        cls.other = Post.objects.create(
+            text='Собака гуляет во дворе',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def _search(self, query, **params):
+        return self.guest_client.get(reverse('search'), {'q': query, **params})
+
+    def test_search_ranked_results(self):
+        """Функция проверяет, что найдены посты со всеми словами запроса
+        и более релевантный пост выводится первым.
+        """
+        response = self._search('кошка диване')
+
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            list(response.context['page']),
+            [self.frequent, self.rare],
+            'Посты найдены неверно или не упорядочены по релевантности'
+        )
+
+    def test_search_index_follows_changes(self):
+        Post.objects.filter(pk=self.other.pk).update(text='Кошка во дворе')
+        Post.objects.filter(pk=self.rare.pk).delete()
+        Post.objects.bulk_create([
+            Post(text='Кошка на крыше', author=self.author),
+        ])
+
+        response = self._search('кошка')
+
+        self.assertEqual(
+            {post.text for post in response.context['page']},
+            {
+                'Кошка, кошка и ещё раз кошка на диване',
+                'Кошка во дворе',
+                'Кошка на крыше',
+            },
+            'Индекс поиска не обновлён после изменения постов'
+        )
+
+    def test_search_query_syntax_escaped(self):
+        for query in ('"кошка', 'кошка OR', 'NEAR(кошка', '*', ''):
+            with self.subTest(query=query):
+                response = self._search(query)
+
+                self.assertEqual(response.status_code, 200)
+
+    def test_search_paginated(self):
+        Post.objects.bulk_create([
+            Post(text=f'Попугай номер {number}', author=self.author)
+            for number in range(POSTS_PER_PAGE + 2)
+        ])
+
+        first = self._search('попугай')
+        second = self._search('попугай', page=2)
+
+        self.assertEqual(first.context['page'].paginator.count,
+                         POSTS_PER_PAGE + 2)
+        self.assertEqual(len(second.context['page']), 2)
+        self.assertContains(first, 'href="?q=%D0%BF%D0%BE%D0%BF%D1%83%D0%B3'
+                                   '%D0%B0%D0%B9&amp;page=2"')
+
+    def test_search_admin_changelist(self):
+        admin = User.objects.create_superuser(
+            username='TestSearchAdmin',
+            email='admin@example.com',
+            password='password',
+        )
+        client = Client()
+        client.force_login(admin)
+
+        response = client.get(
+            reverse('admin:posts_post_changelist'),
+            {'q': 'собака'},
+        )
+
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [self.other],
+        )
+
+    def test_search_fallback_matches_each_word(self):
+        """Функция проверяет, что без FTS5 находятся посты, содержащие
+        все слова запроса в любом порядке.
+        """
+        sleeping = Post.objects.create(
+            text='The cat is sleeping on the sofa',
+            author=self.author,
+        )
+        Post.objects.create(
+            text='The cat walks in the yard',
+            author=self.author,
+        )
+        posts = Post.objects.filter(pk__gt=self.other.pk)
+
+        with mock.patch.object(search, 'uses_fts', return_value=False):
+            results = (
+                ('search_posts', search.search_posts(posts, 'sleeping cat')),
+                ('filter_posts', search.filter_posts(posts, 'Sofa, cat!')),
+            )
+            for name, found in results:
+                with self.subTest(name=name):
+                    self.assertEqual(
+                        list(found),
+                        [sleeping],
+                        'Без FTS5 посты ищутся по всей строке запроса'
+                    )
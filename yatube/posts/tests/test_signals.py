@@ -0,0 +1,50 @@
+"""Модуль проверяет обработчики сигналов приложения Posts:
+1. счётчик комментариев поста увеличивается при создании комментария и
+уменьшается при его удалении.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class PostsSignalsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestSignalsUser')
+        cls.post = Post.objects.create(
+            text='test post text',
+            author=cls.author,
+        )
+
+    def test_signals_comment_changes_post_comments_count(self):
+        """Функция проверяет, что создание и удаление комментария меняет
+        счётчик комментариев поста.
+        """
+        comments = [
+            Comment.objects.create(
+                text='test comment ' + str(number),
+                post=self.post,
+                author=self.author,
+            )
+            for number in range(3)
+        ]
+        self.post.refresh_from_db()
+
+        self.assertEqual(
+            self.post.comments_count,
+            3,
+            'Счётчик комментариев не увеличивается при создании комментария'
+        )
+
+        comments[0].delete()
+        self.post.refresh_from_db()
+
+        self.assertEqual(
+            self.post.comments_count,
+            2,
+            'Счётчик комментариев не уменьшается при удалении комментария'
+        )
@@ -0,0 +1,106 @@
+"""Модуль проверяет счётчики авторов (AuthorStats):
+1. при первом обращении счётчики вычисляются по базе данных, а затем
+меняются при создании и удалении постов и подписок;
+2. информация об авторе для страниц профайла и поста получается одним
+запросом;
+3. команда recount_author_stats исправляет расхождения счётчиков и
+вычисляет их в том же запросе, который их записывает.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import AuthorStats, Follow, Post
+from ..stats import get_author_stats, recount
+from ..views import _get_author_info
+
+User = get_user_model()
+
+
+class PostsAuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestStatsAuthor')
+        cls.reader = User.objects.create_user(username='TestStatsReader')
+        Post.objects.bulk_create(
+            Post(text='test text ' + str(number), author=cls.author)
+            for number in range(3)
+        )
+
+    def _counters(self, user):
+        stats = AuthorStats.objects.get(author=user)
+        return stats.posts_count, stats.followers_count, stats.following_count
+
+    def test_stats_follow_and_posts_change_counters(self):
+        """Функция проверяет, что счётчики вычисляются при первом
+        обращении и меняются вместе с постами и подписками.
+        """
+        get_author_stats(self.author)
+        get_author_stats(self.reader)
+
+        self.assertEqual(self._counters(self.author), (3, 0, 0))
+
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='test new post', author=self.author)
+
+        self.assertEqual(self._counters(self.author), (4, 1, 0))
+        self.assertEqual(self._counters(self.reader), (0, 0, 1))
+
+        follow.delete()
+        post.delete()
+
+        self.assertEqual(self._counters(self.author), (3, 0, 0))
+        self.assertEqual(self._counters(self.reader), (0, 0, 0))
+
+    def test_stats_author_info_single_query(self):
+        """Функция проверяет, что информация об авторе получается одним
+        запросом.
+        """
+        _get_author_info('TestStatsAuthor')
+
+        with self.assertNumQueries(1):
+            author_info = _get_author_info('TestStatsAuthor')
+
+        self.assertEqual(author_info['posts_count'], 3)
+
+    def test_stats_recount_command_repairs_drift(self):
+        get_author_stats(self.author)
+        AuthorStats.objects.filter(author=self.author).update(
+            posts_count=100,
+            followers_count=7,
+        )
+
+        call_command('recount_author_stats', stdout=StringIO())
+
+        self.assertEqual(
+            self._counters(self.author),
+            (3, 0, 0),
+            'Команда recount_author_stats не исправляет счётчики'
+        )
+
+    def test_stats_recount_counts_inside_update(self):
+        """Функция проверяет, что recount создаёт недостающие записи
+        счётчиков и вычисляет счётчики подзапросами в UPDATE, а не
+        отдельным чтением до записи.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as captured:
+            recount()
+
+        self.assertEqual(self._counters(self.author), (3, 1, 0))
+        self.assertEqual(self._counters(self.reader), (0, 0, 1))
+        self.assertFalse(
+            [
+                query['sql'] for query in captured
+                if 'COUNT(' in query['sql']
+                and not query['sql'].startswith('UPDATE')
+            ],
+            'Счётчики вычисляются вне запроса, который их записывает'
+        )
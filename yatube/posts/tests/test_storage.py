@@ -0,0 +1,109 @@
+"""Модуль проверяет хранилище картинок постов (posts.storage):
+1. картинка называется по хешу содержимого, повторная загрузка той же
+картинки не создаёт новый файл;
+2. миниатюры повторно загруженной картинки не создаются заново;
+3. медиафайлы отдаются с заголовком Cache-Control для бессрочного
+кеширования.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from views import serve_media
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PostsImageStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestStorageAuthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def _new_post(self, text, name):
+        self.author_client.post(
+            reverse('new_post'),
+            {
+                'text': text,
+                'image': SimpleUploadedFile(
+                    name=name,
+                    content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            },
+        )
+        return Post.objects.get(text=text)
+
+    def test_storage_same_content_stored_once(self):
+        """Функция проверяет, что одинаковые картинки с разными именами
+        хранятся одним файлом, названным по хешу содержимого.
+        """
+        first = self._new_post('test first text', 'first.GIF')
+        second = self._new_post('test second text', 'second.gif')
+
+        self.assertEqual(
+            first.image.name,
+            'posts/' + hashlib.sha256(SMALL_GIF).hexdigest() + '.gif',
+            'Картинка не названа по хешу содержимого'
+        )
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(
+            os.listdir(os.path.join(settings.MEDIA_ROOT, 'posts')),
+            [os.path.basename(first.image.name)],
+        )
+
+    def test_storage_thumbnails_not_created_again(self):
+        self._new_post('test first text', 'first.gif')
+
+        with mock.patch.object(thumbnails, 'get_thumbnail') as generate:
+            self._new_post('test second text', 'second.gif')
+
+        generate.assert_not_called()
+
+    def test_storage_media_cached_forever(self):
+        post = self._new_post('test first text', 'first.gif')
+        request = RequestFactory().get(post.image.url)
+
+        response = serve_media(
+            request,
+            post.image.name,
+            document_root=settings.MEDIA_ROOT,
+        )
+
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(
+            f'max-age={settings.MEDIA_CACHE_MAX_AGE}',
+            response['Cache-Control'],
+        )
@@ -0,0 +1,254 @@
+"""Модуль проверяет заблаговременное создание миниатюр (posts.thumbnails):
+1. после создания поста с большой картинкой миниатюры ставятся в очередь
+пула, а карточка поста до их создания выводит заглушку;
+2. после создания миниатюр карточка перерисовывается с картинкой;
+3. миниатюры небольших картинок создаются сразу;
+4. готовые миниатюры для всех карточек страницы находятся одним чтением
+кеша без запросов к базе данных;
+5. карточка выводит варианты миниатюры нескольких ширин в форматах WebP и
+JPEG с размерами картинки;
+6. миниатюры картинок, которые не ставились в очередь, не создаются в
+запросе ленты: картинка ставится в очередь, а карточка выводит заглушку;
+7. картинка, миниатюры которой создать не удалось, не ставится в очередь
+повторно и не сбрасывает кеш лент.
+"""
+import re
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import caching, thumbnails
+from ..cards import card_key, render_cards
+from ..models import Post
+
+User = get_user_model()
+
+PLACEHOLDER = 'Заглушка, пока миниатюра создаётся'
+
+
+def image_file(name, size):
+    content = BytesIO()
+    Image.new('RGB', size, (255, 0, 0)).save(content, 'PNG')
+    return SimpleUploadedFile(
+        name=name,
+        content=content.getvalue(),
+        content_type='image/png',
+    )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PostsThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestThumbAuthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def _new_post(self, image):
+        self.author_client.post(
+            reverse('new_post'),
+            {'text': 'test thumbnail text', 'image': image},
+        )
+        return Post.objects.get(text='test thumbnail text')
+
+    @override_settings(POSTS_THUMBNAIL_INLINE_PIXELS=100 * 100)
+    def test_thumbnails_queued_and_placeholder_shown(self):
+        """Функция проверяет, что миниатюры большой картинки создаются в
+        пуле, а до этого карточка выводит заглушку.
+        """
+        on_commit = mock.patch.object(
+            thumbnails.transaction,
+            'on_commit',
+            lambda func: func(),
+        )
+        with mock.patch.object(thumbnails, 'executor') as executor, on_commit:
+            post = self._new_post(image_file('large.png', (400, 300)))
+
+        executor.submit.assert_called_once_with(
+            thumbnails._work,
+            post.pk,
+            post.image.name,
+            caching.post_scopes(None, self.author.pk),
+        )
+        response = self.author_client.get(reverse('index'))
+        self.assertContains(response, PLACEHOLDER)
+        self.assertNotContains(response, 'class="card-img" src=')
+
+        thumbnails.generate(*executor.submit.call_args[0][1:])
+
+        response = self.author_client.get(reverse('index'))
+        self.assertNotContains(
+            response,
+            PLACEHOLDER,
+            msg_prefix='Карточка не перерисована после создания миниатюры'
+        )
+        self.assertContains(response, 'class="card-img" src=')
+
+    def test_thumbnails_small_images_created_inline(self):
+        with mock.patch.object(thumbnails, 'executor') as executor:
+            post = self._new_post(image_file('small.png', (40, 30)))
+
+        executor.submit.assert_not_called()
+        with mock.patch.object(thumbnails, 'get_thumbnail') as generate:
+            thumbnail = thumbnails.ready_thumbnail(post.image, 'card')
+
+        generate.assert_not_called()
+        self.assertTrue(thumbnail.img.exists())
+
+    def test_thumbnails_responsive_variants(self):
+        """Функция проверяет, что карточка выводит варианты миниатюры всех
+        ширин в форматах WebP и JPEG и размеры картинки.
+        """
+        self._new_post(image_file('variants.png', (40, 30)))
+
+        response = self.author_client.get(reverse('index'))
+
+        for mime_type in ('image/webp', 'image/jpeg'):
+            with self.subTest(mime_type=mime_type):
+                srcset = re.search(
+                    f'<source type="{mime_type}" srcset="([^"]+)"',
+                    response.content.decode(),
+                )
+
+                self.assertIsNotNone(srcset, 'В карточке нет <source>')
+                self.assertEqual(
+                    [variant.split()[1] for variant in
+                     srcset.group(1).split(', ')],
+                    ['480w', '720w', '960w'],
+                )
+        self.assertContains(response, 'width="960" height="339"')
+
+    def test_thumbnails_resolved_once_per_page(self):
+        """Функция проверяет, что готовые миниатюры всех карточек
+        находятся одним чтением кеша, без запросов к базе данных.
+        """
+        for number in range(3):
+            self.author_client.post(
+                reverse('new_post'),
+                {
+                    'text': f'test thumbnail text {number}',
+                    'image': image_file(f'small{number}.png', (40, 30)),
+                },
+            )
+        posts = list(Post.objects.select_related('author', 'group'))
+        cache.delete_many([card_key(post) for post in posts])
+
+        with self.assertNumQueries(0), mock.patch.object(
+            thumbnails.cache,
+            'get_many',
+            wraps=thumbnails.cache.get_many,
+        ) as get_many:
+            cards = render_cards(posts)
+
+        self.assertEqual(
+            len([
+                call for call in get_many.call_args_list
+                if all(
+                    key.startswith(thumbnails.READY_PREFIX)
+                    for key in call[0][0]
+                )
+            ]),
+            1,
+            'Миниатюры карточек читаются из кеша не одним запросом'
+        )
+        for card in cards:
+            self.assertIn('class="card-img" src=', card)
+
+    def test_thumbnails_unqueued_image_queued_from_feed(self):
+        """Функция проверяет, что миниатюры картинки поста, созданного в
+        обход очереди, не создаются в запросе ленты: картинка один раз
+        ставится в очередь, а карточка выводит заглушку.
+        """
+        post = Post.objects.create(
+            text='test legacy text',
+            author=self.author,
+            image=image_file('legacy.png', (400, 300)),
+        )
+
+        with mock.patch.object(thumbnails, 'executor') as executor, \
+                mock.patch.object(thumbnails, 'get_thumbnail') as generate:
+            first = self.author_client.get(reverse('index'))
+            self.author_client.get(reverse('index') + '?page=1')
+
+        generate.assert_not_called()
+        executor.submit.assert_called_once_with(
+            thumbnails._work,
+            post.pk,
+            post.image.name,
+            caching.post_scopes(None, self.author.pk),
+        )
+        self.assertContains(first, PLACEHOLDER)
+
+        thumbnails.generate(*executor.submit.call_args[0][1:])
+
+        response = self.author_client.get(reverse('index'))
+        self.assertContains(response, 'class="card-img" src=')
+
+    def test_thumbnails_found_in_kvstore_after_cache_loss(self):
+        """Функция проверяет, что миниатюры, которых нет в кеше готовых
+        вариантов, берутся из хранилища ключей sorl без повторного
+        создания.
+        """
+        post = self._new_post(image_file('evicted.png', (40, 30)))
+        cache.clear()
+
+        with mock.patch.object(thumbnails, 'executor') as executor:
+            self.assertIsNone(thumbnails.ready_thumbnail(post.image, 'card'))
+        with mock.patch.object(default, 'engine') as engine:
+            thumbnails.generate(*executor.submit.call_args[0][1:])
+        picture = thumbnails.ready_thumbnail(post.image, 'card')
+
+        engine.get_image.assert_not_called()
+        self.assertTrue(picture.img.exists())
+        self.assertIn(
+            (post.image.name, 'card'),
+            thumbnails.resolve_thumbnails([post.image], 'card'),
+        )
+
+    def test_thumbnails_failure_not_requeued(self):
+        """Функция проверяет, что после неудачного создания миниатюр
+        пост и поколения лент не меняются, а картинка не ставится в
+        очередь при каждой отрисовке ленты.
+        """
+        post = Post.objects.create(
+            text='test broken text',
+            author=self.author,
+            image=SimpleUploadedFile('broken.png', b'not an image'),
+        )
+        updated = post.updated
+        scopes = caching.post_scopes(None, self.author.pk)
+
+        with mock.patch.object(caching, 'bump') as bump, \
+                self.assertLogs('posts.thumbnails', 'ERROR'):
+            thumbnails.generate(post.pk, post.image.name, scopes)
+
+        bump.assert_not_called()
+        post.refresh_from_db()
+        self.assertEqual(post.updated, updated)
+        with mock.patch.object(thumbnails, 'executor') as executor:
+            response = self.author_client.get(reverse('index'))
+
+        executor.submit.assert_not_called()
+        self.assertContains(response, 'test broken text')
+        self.assertNotContains(response, PLACEHOLDER)
+        with self.assertRaises(thumbnails.ThumbnailError):
+            thumbnails.ready_thumbnail(post.image, 'card')
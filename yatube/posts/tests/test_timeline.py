@@ -0,0 +1,205 @@
+"""Модуль проверяет ленту подписок пользователя (posts.timeline):
+1. при подписке в ленту добавляются все посты автора (последние сразу,
+остальные в фоновом потоке), при отписке посты автора из ленты удаляются;
+2. новый пост раскладывается по лентам подписчиков автора;
+3. посты авторов с большим числом подписчиков не раскладываются по
+лентам, а добавляются в ленту /follow/ при чтении, в том числе на
+следующих страницах.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry, TimelineOptOut
+
+User = get_user_model()
+
+
+class PostsTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestTimelineAuthor')
+        cls.reader = User.objects.create_user(username='TestTimelineReader')
+        cls.old_post = Post.objects.create(
+            text='test old post',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def _timeline_posts(self):
+        return list(
+            TimelineEntry.objects.filter(user=self.reader).values_list(
+                'post_id',
+                flat=True,
+            )
+        )
+
+    def _feed(self):
+        response = self.reader_client.get(reverse('follow_index'))
+        return list(response.context['page'].object_list)
+
+    def test_timeline_follow_backfills_and_unfollow_trims(self):
+        """Функция проверяет, что подписка добавляет в ленту посты
+        автора, а отписка удаляет их.
+        """
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+
+        self.assertEqual(
+            self._timeline_posts(),
+            [self.old_post.pk],
+            'Посты автора не добавляются в ленту при подписке'
+        )
+
+        follow.delete()
+
+        self.assertEqual(
+            self._timeline_posts(),
+            [],
+            'Посты автора не удаляются из ленты при отписке'
+        )
+
+    @override_settings(POSTS_TIMELINE_BACKFILL=2)
+    @mock.patch('posts.timeline.BATCH_SIZE', 2)
+    def test_timeline_follow_backfills_all_posts(self):
+        """Функция проверяет, что при подписке в ленту сразу добавляются
+        POSTS_TIMELINE_BACKFILL последних постов автора, а остальные - в
+        фоновом потоке после фиксации транзакции, даже если их больше
+        одной части BATCH_SIZE.
+        """
+        Post.objects.bulk_create(
+            Post(text=f'test post {number}', author=self.author)
+            for number in range(4)
+        )
+        on_commit = mock.patch.object(
+            timeline.transaction,
+            'on_commit',
+            side_effect=lambda func: func(),
+        )
+        with mock.patch.object(timeline, 'executor') as executor, on_commit:
+            Follow.objects.create(user=self.reader, author=self.author)
+
+        self.assertCountEqual(
+            self._timeline_posts(),
+            Post.objects.filter(author=self.author).values_list(
+                'pk',
+                flat=True,
+            )[:2],
+            'В ленту при подписке сразу добавляются не последние посты'
+        )
+        executor.submit.assert_called_once_with(
+            timeline._work,
+            self.reader.pk,
+            self.author.pk,
+        )
+
+        timeline._work(*executor.submit.call_args[0][1:])
+
+        self.assertCountEqual(
+            self._timeline_posts(),
+            Post.objects.filter(author=self.author).values_list(
+                'pk',
+                flat=True,
+            ),
+            'В ленту при подписке добавляются не все посты автора'
+        )
+
+    def test_timeline_new_post_fans_out_to_followers(self):
+        """Функция проверяет, что новый пост появляется в ленте
+        подписчика.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(
+            text='test new post',
+            author=self.author,
+        )
+
+        self.assertEqual(
+            self._feed(),
+            [new_post, self.old_post],
+            'Новый пост не добавляется в ленту подписчика'
+        )
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=0)
+    def test_timeline_large_author_merged_at_read_time(self):
+        """Функция проверяет, что пост автора, у которого подписчиков
+        больше POSTS_TIMELINE_FANOUT_LIMIT, не раскладывается по лентам,
+        но попадает в ленту /follow/ при чтении.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(
+            text='test new post',
+            author=self.author,
+        )
+
+        self.assertTrue(
+            TimelineOptOut.objects.filter(author=self.author).exists(),
+            'Автор с большим числом подписчиков не переведён на добавление '
+            'постов в ленту при чтении'
+        )
+        self.assertNotIn(new_post.pk, self._timeline_posts())
+        self.assertEqual(
+            self._feed(),
+            [new_post, self.old_post],
+            'Посты автора не добавляются в ленту при чтении'
+        )
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=1)
+    def test_timeline_merged_pages(self):
+        """Функция проверяет, что посты из ленты пользователя и посты
+        автора, добавляемые при чтении, сливаются по дате публикации на
+        всех страницах ленты и при переходе по курсору.
+        """
+        small_author = User.objects.create_user(username='TestTimelineSmall')
+        Follow.objects.create(user=self.reader, author=small_author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(
+            user=User.objects.create_user(username='TestTimelineOther'),
+            author=self.author,
+        )
+        for number in range(12):
+            Post.objects.create(
+                text=f'test post {number}',
+                author=(small_author, self.author)[number % 2],
+            )
+        expected = list(
+            Post.objects.filter(author__in=[small_author, self.author])
+        )
+
+        second_page = self.reader_client.get(
+            reverse('follow_index'),
+            {'page': 2},
+        ).context['page']
+        first_cursor_page = self.reader_client.get(
+            reverse('follow_index'),
+            {'cursor': ''},
+        ).context['page']
+        next_cursor_page = self.reader_client.get(
+            reverse('follow_index'),
+            {'cursor': first_cursor_page.next_cursor},
+        ).context['page']
+
+        self.assertTrue(
+            TimelineOptOut.objects.filter(author=self.author).exists()
+        )
+        self.assertEqual(second_page.paginator.count, len(expected))
+        self.assertEqual(
+            [self._feed(), list(second_page.object_list)],
+            [expected[:10], expected[10:]],
+            'Посты ленты и автора, добавляемые при чтении, сливаются '
+            'неправильно'
+        )
+        self.assertEqual(
+            [
+                list(first_cursor_page.object_list),
+                list(next_cursor_page.object_list),
+            ],
+            [expected[:10], expected[10:]],
+            'Лента подписок неправильно листается по курсору'
+        )
@@ -12,6 +12,7 @@ c правами пользователей (анонимный пользова
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 from ..models import Group, Post
@@ -109,6 +110,7 @@ class PostsURLTests(TestCase):
         пользователя - authorized_client,пользователя - автор поста -
         author_client.
         """
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.test_user)
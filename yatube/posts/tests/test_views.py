@@ -27,20 +27,33 @@
 других пользователей и удалять их из подписок.
 6. Проверяет, что новая запись пользователя появляется в ленте тех, кто
 на него подписан и не появляется в ленте тех, кто не подписан на него.
+7. Проверяет, что число SQL-запросов на страницу ленты не зависит от
+числа постов на странице.
+8. Проверяет, что страницы лент и поста отвечают 304 Not Modified на
+условный запрос, пока их содержимое не изменилось.
+9. Проверяет, что страница поста собирается одним запросом к посту,
+автору и группе, а пост другого автора даёт 404.
+10. Проверяет, что комментарии на странице поста выводятся постранично с
+подгрузкой следующих страниц по курсору, а число SQL-запросов не зависит
+от числа комментариев.
 """
-
+import re
 import shutil
 import tempfile
+from http import HTTPStatus
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
+from ..views import COMMENTS_PER_PAGE
 
 User = get_user_model()
 
@@ -387,28 +400,61 @@ class PostsViewTests(TestCase):
         )
 
     def test_posts_index_cache(self):
-        """Функция проверяет работу кеша на главной странице.
+        """Функция проверяет работу кеша на главной странице: страница
+        берётся из кеша, пока посты не меняются, и обновляется сразу после
+        создания нового поста.
         """
         initial_response = self.authorized_client.get(reverse('index'))
+        # Изменение без сигналов не сбрасывает кеш
+        Post.objects.filter(pk=self.post.pk).update(text='test not cached')
+        cached_response = self.authorized_client.get(reverse('index'))
         Post.objects.create(
             text='test cache',
             author=self.author,
         )
-        cached_response = self.authorized_client.get(reverse('index'))
-        cache.clear()
-        uncached_response = self.authorized_client.get(reverse('index'))
+        updated_response = self.authorized_client.get(reverse('index'))
 
         self.assertEqual(
             initial_response.content,
             cached_response.content,
-            'Контент страницы изменился за время менее времени кэширования'
+            'Главная страница не берётся из кеша'
         )
-        self.assertNotEqual(
-            uncached_response.content,
-            initial_response.content,
-            'Кэширование работает некоректно'
+        self.assertContains(
+            updated_response,
+            'test cache',
+            msg_prefix='Кеш главной страницы не сбрасывается после '
+                       'создания поста'
         )
 
+    def test_posts_feeds_cache_invalidated_by_comment(self):
+        """Функция проверяет, что новый комментарий сбрасывает кеш ленты
+        главной страницы, сообщества и профайла автора поста.
+        """
+        post = Post.objects.get(text='test text 13')
+        feeds = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test_slug'}),
+            reverse('profile', kwargs={'username': 'TestPostUser'}),
+        )
+        for feed in feeds:
+            self.authorized_client.get(feed)
+        Comment.objects.create(
+            text='test comment',
+            post=post,
+            author=self.follower,
+        )
+
+        for feed in feeds:
+            with self.subTest(feed=feed):
+                response = self.authorized_client.get(feed)
+
+                self.assertContains(
+                    response,
+                    'Comments: 1',
+                    msg_prefix=f'Кеш страницы {feed} не сбрасывается '
+                               'после добавления комментария'
+                )
+
     def test_posts_authorized_can_subscribe(self):
         """Функция проверяет, что авторизованный пользователь может
         подписываться на других пользователей.
@@ -507,3 +553,306 @@ class PostsViewTests(TestCase):
             'Новая запись пользователя появляется в ленте тех, на кого '
             'он не подписан'
         )
+
+
+class PostsFeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestFeedAuthor')
+        cls.reader = User.objects.create_user(username='TestFeedReader')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_feed_slug',
+            description='test group description',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.feeds = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test_feed_slug'}),
+            reverse('profile', kwargs={'username': 'TestFeedAuthor'}),
+            reverse('follow_index'),
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def _create_posts(self, number_of_posts):
+        for number in range(number_of_posts):
+            post = Post.objects.create(
+                text='test text ' + str(number),
+                author=self.author,
+                group=self.group,
+            )
+            Comment.objects.create(
+                text='test comment',
+                post=post,
+                author=self.reader,
+            )
+
+    def _count_queries(self, feed):
+        # Первый запрос создаёт счётчики автора, считаем запросы
+        # для повторного обращения к странице.
+        self.reader_client.get(feed)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(feed)
+        return len(queries), len(response.context['page'])
+
+    def test_posts_feed_queries_do_not_depend_on_page_size(self):
+        """Функция проверяет, что число запросов к базе данных для
+        страницы ленты одинаково для страницы из одного поста и для
+        полной страницы.
+        """
+        self._create_posts(1)
+        small_pages = {feed: self._count_queries(feed) for feed in self.feeds}
+        self._create_posts(10)
+
+        for feed in self.feeds:
+            with self.subTest(feed=feed):
+                small_queries, small_size = small_pages[feed]
+                full_queries, full_size = self._count_queries(feed)
+
+                self.assertEqual((small_size, full_size), (1, 10))
+                self.assertEqual(
+                    full_queries,
+                    small_queries,
+                    f'Число запросов на странице {feed} растёт с числом '
+                    'постов на странице'
+                )
+
+
+class PostsConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestETagAuthor')
+        cls.reader = User.objects.create_user(username='TestETagReader')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_etag_slug',
+            description='test group description',
+        )
+        cls.post = Post.objects.create(
+            text='test post text',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.pages = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test_etag_slug'}),
+            reverse('profile', kwargs={'username': 'TestETagAuthor'}),
+            reverse(
+                'post',
+                kwargs={'username': 'TestETagAuthor', 'post_id': cls.post.pk}
+            ),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def _etags(self):
+        # Первый запрос к странице поста устанавливает CSRF-cookie, которая
+        # входит в ETag этой страницы.
+        self.reader_client.get(self.pages[-1])
+        return {
+            page: self.reader_client.get(page)['ETag'] for page in self.pages
+        }
+
+    def _revalidate(self, etags):
+        return {
+            page: self.reader_client.get(
+                page,
+                HTTP_IF_NONE_MATCH=etag,
+            ).status_code
+            for page, etag in etags.items()
+        }
+
+    def test_posts_pages_not_modified(self):
+        """Функция проверяет, что страница с неизменившимся содержимым
+        отвечает 304 без отрисовки шаблона.
+        """
+        etags = self._etags()
+
+        for page, status in self._revalidate(etags).items():
+            with self.subTest(page=page):
+                self.assertEqual(
+                    status,
+                    HTTPStatus.NOT_MODIFIED,
+                    f'Страница {page} не отвечает 304 Not Modified'
+                )
+
+    def test_posts_pages_modified_after_comment(self):
+        """Функция проверяет, что после нового комментария все страницы
+        с постом отдаются заново.
+        """
+        etags = self._etags()
+        Comment.objects.create(
+            text='test comment',
+            post=self.post,
+            author=self.reader,
+        )
+
+        for page, status in self._revalidate(etags).items():
+            with self.subTest(page=page):
+                self.assertEqual(
+                    status,
+                    HTTPStatus.OK,
+                    f'Страница {page} не обновляется после комментария'
+                )
+
+    def test_posts_profile_modified_after_follow(self):
+        profile = reverse('profile', kwargs={'username': 'TestETagAuthor'})
+        etag = self.reader_client.get(profile)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        response = self.reader_client.get(profile, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Unsubscribe')
+
+
+class PostsPostPageQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestPostPageAuthor')
+        cls.other = User.objects.create_user(username='TestPostPageOther')
+        cls.group = Group.objects.create(
+            title='test_group_title',
+            slug='test_post_page_slug',
+            description='test group description',
+        )
+        cls.post = Post.objects.create(
+            text='test post text',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_posts_post_page_queries(self):
+        """Функция проверяет, что страница поста без комментариев стоит
+        трёх запросов: автор по адресу, пост с автором, счётчиками и
+        группой, страница комментариев.
+        """
+        url = reverse(
+            'post',
+            kwargs={'username': 'TestPostPageAuthor', 'post_id': self.post.pk}
+        )
+        # Первый запрос создаёт счётчики автора
+        self.guest_client.get(url)
+        cache.clear()
+
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(url)
+
+        self.assertEqual(response.context['post'], self.post)
+        self.assertContains(response, 'test_group_title')
+
+    def test_posts_post_of_other_author_not_found(self):
+        url = reverse(
+            'post',
+            kwargs={'username': 'TestPostPageOther', 'post_id': self.post.pk}
+        )
+
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(url)
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class PostsCommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestCommentsAuthor')
+        cls.post = Post.objects.create(
+            text='test post text',
+            author=cls.author,
+        )
+        cls.post_url = reverse(
+            'post',
+            kwargs={'username': 'TestCommentsAuthor', 'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def _create_comments(self, number_of_comments, prefix='TestCommenter'):
+        for number in range(number_of_comments):
+            Comment.objects.create(
+                text=f'test comment {number}',
+                post=self.post,
+                author=User.objects.create_user(
+                    username=f'{prefix}{number}'
+                ),
+            )
+
+    def test_posts_comments_loaded_by_pages(self):
+        """Функция проверяет, что страница поста выводит только первую
+        страницу комментариев, а остальные подгружаются по ссылке
+        «Load more comments».
+        """
+        self._create_comments(COMMENTS_PER_PAGE * 2 + 1)
+
+        response = self.guest_client.get(self.post_url)
+        self.assertEqual(len(response.context['comments']), COMMENTS_PER_PAGE)
+        shown = list(response.context['comments'])
+        content = response.content.decode()
+        while 'data-load-comments' in content:
+            url = re.search(r'href="([^"]+)"\s+data-load-comments', content)
+            response = self.guest_client.get(url.group(1))
+            self.assertTemplateUsed(response, 'posts/comment_list.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            shown.extend(response.context['comments'])
+            content = response.content.decode()
+
+        self.assertEqual(
+            shown,
+            list(Comment.objects.order_by('-created', '-pk')),
+            'Комментарии выводятся не все или с повторами'
+        )
+
+    def test_posts_comments_wrong_author_not_found(self):
+        User.objects.create_user(username='TestCommentsOther')
+
+        response = self.guest_client.get(
+            reverse(
+                'post_comments',
+                kwargs={
+                    'username': 'TestCommentsOther',
+                    'post_id': self.post.pk,
+                }
+            )
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_posts_comments_queries_do_not_depend_on_comments(self):
+        """Функция проверяет, что число запросов к базе данных для
+        страницы поста одинаково для одного комментария и для
+        нескольких страниц комментариев разных авторов.
+        """
+        self._create_comments(1)
+        self.guest_client.get(self.post_url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as few:
+            self.guest_client.get(self.post_url)
+        self._create_comments(COMMENTS_PER_PAGE * 2, 'TestManyCommenter')
+        self.guest_client.get(self.post_url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            self.guest_client.get(self.post_url)
+
+        self.assertEqual(
+            len(many),
+            len(few),
+            'Число запросов на странице поста растёт с числом комментариев'
+        )
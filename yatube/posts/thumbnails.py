@@ -0,0 +1,259 @@
+"""Модуль для заблаговременного создания миниатюр картинок постов.
+Для каждой миниатюры из POSTS_THUMBNAILS создаются варианты нескольких
+ширин в нескольких форматах (WebP и JPEG), из которых браузер выбирает
+подходящий по srcset. После сохранения поста варианты создаются в фоновом
+пуле потоков, поэтому запрос ленты не тратит время на
+декодирование и масштабирование оригинала. Пока миниатюра создаётся,
+карточка поста выводит заглушку.
+
+Созданные варианты запоминаются в кеше Django (READY_PREFIX) списком,
+полученным от get_thumbnail, поэтому готовые миниатюры всей страницы
+читаются одним cache.get_many независимо от хранилища ключей sorl.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import deserialize_image_file, serialize_image_file
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+PENDING_PREFIX = 'posts:thumbnail:pending:'
+READY_PREFIX = 'posts:thumbnail:ready:'
+# Значение READY_PREFIX для картинки, миниатюры которой создать не удалось
+FAILED = 'failed'
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+    thread_name_prefix='posts-thumbnails',
+)
+
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
+
+
+def _variants(size):
+    """Функция возвращает варианты миниатюры size: список кортежей
+    (формат, ширина, геометрия, параметры sorl) по формату и возрастанию
+    ширины. Высота вариантов сохраняет пропорции геометрии миниатюры.
+    """
+    thumbnail = settings.POSTS_THUMBNAILS[size]
+    width, height = map(int, thumbnail['geometry'].split('x'))
+    return [
+        (
+            format_,
+            variant_width,
+            f'{variant_width}x{round(height * variant_width / width)}',
+            {**thumbnail['options'], 'format': format_},
+        )
+        for format_ in thumbnail['formats']
+        for variant_width in sorted(thumbnail['widths'])
+    ]
+
+
+def placeholder_ratio(size):
+    """Функция возвращает отношение высоты миниатюры size к ширине в
+    процентах для заглушки того же размера, что и картинка.
+    """
+    width, height = map(
+        int,
+        settings.POSTS_THUMBNAILS[size]['geometry'].split('x'),
+    )
+    return f'{height / width * 100:.2f}%'
+
+
+class Picture:
+    """Варианты миниатюры картинки для тега <picture>: источник srcset
+    для каждого формата и картинка для браузеров без <picture> - самый
+    широкий вариант последнего формата.
+    """
+
+    def __init__(self, size, thumbnails):
+        self.sizes = settings.POSTS_THUMBNAILS[size]['sizes']
+        srcsets = {}
+        for (format_, width, _, _), thumbnail in zip(
+            _variants(size),
+            thumbnails,
+        ):
+            srcsets.setdefault(format_, []).append(f'{thumbnail.url} {width}w')
+        self.sources = [
+            {'type': MIME_TYPES[format_], 'srcset': ', '.join(srcset)}
+            for format_, srcset in srcsets.items()
+        ]
+        self.img = thumbnails[-1]
+        # У миниатюры, которую не удалось создать, размера нет
+        self.width, self.height = self.img.size or (None, None)
+
+
+def ready_thumbnail(file_, size):
+    """Функция возвращает варианты миниатюры size картинки поста file_
+    (Picture). Если миниатюры ещё не готовы, возвращает None, а картинки,
+    которые не ставились в очередь (например, загруженные до появления
+    очереди), ставит в очередь пула: запрос ленты их не создаёт. Для
+    картинок, миниатюры которых создать не удалось, вызывает
+    ThumbnailError.
+    """
+    values = cache.get(_ready_key(file_.name, size))
+    if values == FAILED:
+        raise ThumbnailError(f'Thumbnails of {file_.name} failed')
+    if values is None:
+        _queue(file_.instance)
+        return None
+    return Picture(size, [deserialize_image_file(value) for value in values])
+
+
+class ThumbnailError(Exception):
+    """Миниатюры картинки не удалось создать; повторная попытка будет не
+    раньше чем через POSTS_THUMBNAIL_RETRY_TIMEOUT секунд.
+    """
+
+
+def _ready_key(name, size):
+    """Функция возвращает ключ кеша готовых вариантов миниатюры size
+    картинки name. Ключ меняется вместе с настройками вариантов.
+    """
+    variants = f'{name}|{size}|{_variants(size)}'
+    return READY_PREFIX + hashlib.md5(variants.encode()).hexdigest()
+
+
+def _remember(name, size, thumbnails):
+    cache.set(
+        _ready_key(name, size),
+        [serialize_image_file(thumbnail) for thumbnail in thumbnails],
+        thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+    )
+
+
+def resolve_thumbnails(images, size):
+    """Функция находит готовые миниатюры size сразу для всех картинок
+    images одним запросом cache.get_many. Возвращает словарь
+    {(имя картинки, size): Picture}; картинок, миниатюры которых ещё не
+    созданы, в словаре нет.
+    """
+    keys = {_ready_key(image.name, size): image.name for image in images}
+    if not keys:
+        return {}
+    return {
+        (keys[key], size): Picture(
+            size,
+            [deserialize_image_file(value) for value in values],
+        )
+        for key, values in cache.get_many(keys).items()
+        if values != FAILED
+    }
+
+
+def _thumbnails(image, size):
+    thumbnails = []
+    for _, _, geometry, options in _variants(size):
+        thumbnail = get_thumbnail(image, geometry, **options)
+        # Если оригинал не читается, sorl пишет ошибку в журнал и
+        # возвращает несозданную миниатюру
+        if not thumbnail.exists():
+            raise ThumbnailError(f'{thumbnail.name} was not created')
+        thumbnails.append(thumbnail)
+    return thumbnails
+
+
+def _create(image):
+    """Функция создаёт миниатюры всех размеров картинки image. Возвращает
+    False, если создать их не удалось: такая картинка помечается FAILED и
+    не ставится в очередь до истечения POSTS_THUMBNAIL_RETRY_TIMEOUT.
+    """
+    created = True
+    for size in settings.POSTS_THUMBNAILS:
+        try:
+            _remember(image.name, size, _thumbnails(image, size))
+        except Exception:
+            logger.exception('Thumbnail generation failed for %s', image.name)
+            cache.set(
+                _ready_key(image.name, size),
+                FAILED,
+                settings.POSTS_THUMBNAIL_RETRY_TIMEOUT,
+            )
+            created = False
+    return created
+
+
+def pregenerate(post):
+    """Функция создаёт миниатюры картинки поста post. Миниатюры небольших
+    картинок (до POSTS_THUMBNAIL_INLINE_PIXELS точек) создаются сразу: это
+    быстрее, чем показать заглушку и перерисовать карточку. Остальные
+    ставятся в очередь пула после фиксации транзакции.
+    """
+    if not post.image:
+        return
+    # Картинка с тем же содержимым уже загружалась: её имя и миниатюры
+    # совпадают (см. posts.storage)
+    if all(
+        (post.image.name, size) in resolve_thumbnails([post.image], size)
+        for size in settings.POSTS_THUMBNAILS
+    ):
+        return
+    width, height = post.image.width, post.image.height
+    if width and height and (
+        width * height <= settings.POSTS_THUMBNAIL_INLINE_PIXELS
+    ):
+        _create(post.image)
+        return
+    transaction.on_commit(lambda: _queue(post))
+
+
+def _queue(post):
+    """Функция ставит создание миниатюр картинки поста post в очередь
+    пула, если картинка ещё не стоит в очереди.
+    """
+    name = post.image.name
+    if not cache.add(
+        PENDING_PREFIX + name,
+        True,
+        settings.POSTS_THUMBNAIL_PENDING_TIMEOUT,
+    ):
+        return
+    executor.submit(
+        _work,
+        post.pk,
+        name,
+        caching.post_scopes(post.group_id, post.author_id),
+    )
+
+
+def generate(post_id, name, scopes):
+    """Функция создаёт миниатюры всех размеров для картинки name поста
+    post_id. Если они созданы, меняет время изменения поста и поколения
+    лент scopes, чтобы закешированные карточки с заглушкой отрисовались
+    заново.
+    """
+    try:
+        created = _create(Post(pk=post_id, image=name).image)
+    finally:
+        cache.delete(PENDING_PREFIX + name)
+    if not created:
+        return
+    Post.objects.filter(pk=post_id, image=name).update(
+        updated=timezone.now()
+    )
+    caching.bump(*scopes)
+
+
+def _work(post_id, name, scopes):
+    try:
+        generate(post_id, name, scopes)
+    except Exception:
+        logger.exception('Thumbnail job failed for post %s', post_id)
+    finally:
+        # У каждого потока пула своё соединение с базой данных
+        connection.close()
@@ -0,0 +1,273 @@
+"""Модуль для работы с лентой подписок пользователей (/follow/).
+Посты раскладываются по лентам подписчиков при публикации. Для авторов с
+большим числом подписчиков (TimelineOptOut) посты добавляются в ленту при
+чтении.
+"""
+import heapq
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .bulk import bulk_create_chunked
+from .models import Follow, Post, TimelineEntry, TimelineOptOut
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+executor = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix='posts-timeline',
+)
+
+
+def _is_opted_out(author_id):
+    return TimelineOptOut.objects.filter(author_id=author_id).exists()
+
+
+def fan_out(post):
+    """Функция добавляет пост в ленты всех подписчиков автора. Если
+    подписчиков больше POSTS_TIMELINE_FANOUT_LIMIT, автор переводится на
+    добавление постов в ленту при чтении.
+    """
+    if _is_opted_out(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id)
+    if followers.count() > settings.POSTS_TIMELINE_FANOUT_LIMIT:
+        TimelineOptOut.objects.get_or_create(author_id=post.author_id)
+        return
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.values_list('user_id', flat=True)
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def _insert(entries):
+    """Функция записывает записи ленты entries частями по BATCH_SIZE.
+    """
+    bulk_create_chunked(
+        TimelineEntry,
+        entries,
+        BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_posts(posts):
+    """Функция добавляет посты из queryset posts в ленты подписчиков их
+    авторов (например, после bulk_create): подписчики всех авторов
+    читаются одним запросом, записи ленты - частями по BATCH_SIZE. Авторы
+    с числом подписчиков больше POSTS_TIMELINE_FANOUT_LIMIT переводятся
+    на добавление постов в ленту при чтении.
+    """
+    author_posts = defaultdict(list)
+    for pk, author_id, pub_date in posts.values_list(
+        'pk',
+        'author_id',
+        'pub_date',
+    ).iterator():
+        author_posts[author_id].append((pk, pub_date))
+    opted_out = set(
+        TimelineOptOut.objects.filter(
+            author_id__in=author_posts,
+        ).values_list('author_id', flat=True)
+    )
+    followers = defaultdict(list)
+    for author_id, user_id in Follow.objects.filter(
+        author_id__in=author_posts.keys() - opted_out,
+    ).values_list('author_id', 'user_id').iterator():
+        followers[author_id].append(user_id)
+    for author_id, users in followers.items():
+        if len(users) > settings.POSTS_TIMELINE_FANOUT_LIMIT:
+            TimelineOptOut.objects.get_or_create(author_id=author_id)
+            continue
+        _insert(
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in author_posts[author_id]
+            for user_id in users
+        )
+
+
+def backfill_many(follows):
+    """Функция добавляет в ленты подписчиков все посты авторов, на которых
+    они подписались: follows - пары (user_id, author_id). Посты всех
+    авторов читаются одним запросом, записи ленты - частями по
+    BATCH_SIZE, поэтому память не зависит от числа постов.
+    """
+    users = defaultdict(list)
+    for user_id, author_id in follows:
+        users[author_id].append(user_id)
+    opted_out = TimelineOptOut.objects.filter(
+        author_id__in=users,
+    ).values_list('author_id', flat=True)
+    for author_id in opted_out:
+        del users[author_id]
+    if not users:
+        return
+    posts = Post.objects.filter(author_id__in=users).order_by().values_list(
+        'pk',
+        'author_id',
+        'pub_date',
+    ).iterator(chunk_size=BATCH_SIZE)
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, author_id, pub_date in posts
+        for user_id in users[author_id]
+    )
+
+
+def backfill(user_id, author_id):
+    """Функция добавляет в ленту пользователя посты автора, на которого он
+    подписался: POSTS_TIMELINE_BACKFILL последних постов сразу, остальные -
+    в фоновом потоке после фиксации транзакции, чтобы запрос подписки не
+    копировал все посты автора.
+    """
+    if _is_opted_out(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date',
+        '-pk',
+    ).values_list('pk', 'pub_date')
+    recent = list(posts[:settings.POSTS_TIMELINE_BACKFILL + 1])
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in recent[:settings.POSTS_TIMELINE_BACKFILL]
+    )
+    if len(recent) > settings.POSTS_TIMELINE_BACKFILL:
+        transaction.on_commit(
+            lambda: executor.submit(_work, user_id, author_id)
+        )
+
+
+def _work(user_id, author_id):
+    try:
+        # Пользователь мог отписаться, пока задача ждала в очереди
+        follows = Follow.objects.filter(user_id=user_id, author_id=author_id)
+        if follows.exists():
+            backfill_many([(user_id, author_id)])
+    except Exception:
+        logger.exception(
+            'Timeline backfill failed for user %s and author %s',
+            user_id,
+            author_id,
+        )
+    finally:
+        # У потока пула своё соединение с базой данных
+        connection.close()
+
+
+def trim(user_id, author_id):
+    """Функция удаляет из ленты пользователя посты автора, от которого он
+    отписался.
+    """
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id,
+    ).delete()
+
+
+# Поля записи ленты, по которым сортируются посты ленты пользователя:
+# так лента читается по индексу (user, pub_date, post) без сортировки постов
+TIMELINE_ORDERING = {
+    'pub_date': 'timeline_entries__pub_date',
+    'pk': 'timeline_entries__post_id',
+}
+
+
+def _source_ordering(fields, aliases):
+    # F() не подставляет сортировку связанной модели вместо поля post_id
+    ordering = []
+    for field in fields:
+        name = field.lstrip('-')
+        expression = F(aliases.get(name, name))
+        ordering.append(
+            expression.desc() if field.startswith('-') else expression.asc()
+        )
+    return ordering
+
+
+class MergedTimeline:
+    """Лента подписок, собранная из нескольких источников постов,
+    упорядоченных по (pub_date, id): ленты пользователя и постов каждого
+    автора, добавляемых в ленту при чтении. Срез ленты [start:stop]
+    читает из каждого источника не больше stop постов по его индексу и
+    сливает их, поэтому стоимость страницы не зависит от числа постов
+    других авторов. Повторяет ту часть интерфейса QuerySet, которую
+    используют паджинаторы.
+    """
+
+    ordered = True
+
+    def __init__(self, sources, ordering=('-pub_date', '-pk')):
+        # sources - пары (queryset, псевдонимы полей сортировки)
+        self.sources = sources
+        self.ordering = ordering
+
+    def filter(self, *args, **kwargs):
+        return MergedTimeline(
+            [
+                (queryset.filter(*args, **kwargs), aliases)
+                for queryset, aliases in self.sources
+            ],
+            self.ordering,
+        )
+
+    def order_by(self, *fields):
+        return MergedTimeline(self.sources, fields)
+
+    def count(self):
+        return sum(queryset.count() for queryset, _ in self.sources)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        merged = heapq.merge(
+            *(
+                queryset.order_by(
+                    *_source_ordering(self.ordering, aliases)
+                )[:key.stop]
+                for queryset, aliases in self.sources
+            ),
+            key=attrgetter('pub_date', 'pk'),
+            reverse=self.ordering[0].startswith('-'),
+        )
+        return list(islice(merged, key.start, key.stop))
+
+
+def timeline_posts(post_list, user):
+    """Функция отбирает из post_list посты ленты подписок пользователя:
+    посты из его ленты и посты подписанных авторов, для которых лента
+    собирается при чтении (см. MergedTimeline).
+    """
+    merged_authors = list(
+        Follow.objects.filter(
+            user=user,
+            author__timeline_opt_out__isnull=False,
+        ).values_list('author_id', flat=True)
+    )
+    timeline = post_list.filter(timeline_entries__user=user)
+    if not merged_authors:
+        return timeline.order_by(
+            F(TIMELINE_ORDERING['pub_date']).desc(),
+            F(TIMELINE_ORDERING['pk']).desc(),
+        )
+    # Посты, попавшие в ленту до перевода автора на добавление при чтении,
+    # читаются из постов автора, чтобы не повторяться на странице
+    sources = [
+        (timeline.exclude(author_id__in=merged_authors), TIMELINE_ORDERING),
+    ]
+    sources.extend(
+        (post_list.filter(author_id=author_id), {})
+        for author_id in merged_authors
+    )
+    return MergedTimeline(sources)
@@ -1,21 +1,63 @@
 """Модуль с описанием view-функций приложения posts.
 """
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_GET, require_http_methods
+from django.utils.http import urlencode
+from django.views.decorators.http import (condition, require_GET,
+                                          require_http_methods)
 
+from . import caching, thumbnails
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .holes import cache_page_with_holes
+from .models import Comment, Follow, Group, Post
+from .paginators import CachedCountPaginator, CursorPaginator
+from .search import search_posts
+from .stats import get_author_stats
+from .timeline import timeline_posts
 
 User = get_user_model()
 
 
-def _all_posts(request, post_list):
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+
+def _feed_posts(*conditions, **filters):
+    """Функция возвращает queryset ленты постов, отобранных по conditions
+    и filters. Всё, что используется в карточке поста posts/post_item.html,
+    подгружается тем же запросом.
+    """
+    return Post.objects.filter(*conditions, **filters).select_related(
+        'author',
+        'group',
+    )
+
+
+def _all_posts(request, post_list, count_scope=None):
     """Функция для получения страницы с постами.
+    По умолчанию используется постраничная навигация ?page=N. Если передан
+    параметр ?cursor=, страница выбирается по курсору (pub_date, id) без
+    подсчёта общего числа постов. Для лент с count_scope число постов
+    берётся из кеша.
     """
-    paginator = Paginator(post_list, 10)
+    if 'cursor' in request.GET:
+        paginator = CursorPaginator(post_list, POSTS_PER_PAGE)
+        return {
+            'page': paginator.get_page(request.GET.get('cursor')),
+            'cursor_pagination': True,
+        }
+    if count_scope is None:
+        paginator = Paginator(post_list, POSTS_PER_PAGE)
+    else:
+        paginator = CachedCountPaginator(
+            post_list,
+            POSTS_PER_PAGE,
+            count_scope,
+        )
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
     return {
@@ -23,23 +65,103 @@ def _all_posts(request, post_list):
     }
 
 
+def _fragment_cache(*scopes):
+    """Функция возвращает параметры кеша фрагмента ленты: время хранения
+    и поколение лент scopes, которое меняется при изменении их постов.
+    """
+    return {
+        'cache_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
+        'cache_generation': caching.get_generations(*scopes),
+    }
+
+
+def _etag(request, generation):
+    """Функция возвращает ETag страницы: поколение generation лент, от
+    которых зависит страница, и пользователя, для которого она отрисована.
+    """
+    if generation is None:
+        return None
+    viewer = request.user.pk if request.user.is_authenticated else 'guest'
+    return f'{generation}-{viewer}'
+
+
+def _index_etag(request):
+    return _etag(request, caching.get_generations(caching.INDEX))
+
+
+def _group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk',
+        flat=True,
+    ).first()
+    if group_id is None:
+        return None
+    return _etag(
+        request,
+        caching.get_generations(caching.group_scope(group_id)),
+    )
+
+
+def _author_generation(request, username, post_id=None):
+    """Функция возвращает поколение страниц автора username (профайла и
+    постов) или None, если автора нет или пост post_id принадлежит другому
+    автору. Значение запоминается в request: его используют и ETag, и кеш
+    страницы.
+    """
+    if not hasattr(request, '_author_generation'):
+        if post_id is None:
+            authors = User.objects.filter(username=username)
+            field = 'pk'
+        else:
+            # Пост другого автора - это 404, а не страница автора username
+            authors = Post.objects.filter(
+                pk=post_id,
+                author__username=username,
+            )
+            field = 'author_id'
+        author_id = authors.values_list(field, flat=True).first()
+        request._author_generation = None
+        if author_id is not None:
+            request._author_generation = caching.get_generations(
+                caching.author_scope(author_id),
+                caching.follow_scope(author_id),
+            )
+    return request._author_generation
+
+
+def _profile_etag(request, username):
+    return _etag(request, _author_generation(request, username))
+
+
+def _post_etag(request, username, post_id):
+    etag = _etag(request, _author_generation(request, username, post_id))
+    if etag is None:
+        return None
+    # Страница содержит форму комментария с CSRF-токеном
+    csrf_token = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return f'{etag}-{csrf_token}'
+
+
 @require_GET
+@condition(etag_func=_index_etag)
 def index(request):
     """View-функция для главной страницы проекта.
     """
-    post_list = Post.objects.all()
+    post_list = _feed_posts()
     page_number = request.GET.get('page')
     return render(
         request,
         'posts/index.html',
         {
-            **_all_posts(request, post_list),
+            **_all_posts(request, post_list, caching.INDEX),
+            **_fragment_cache(caching.INDEX),
             'page_number': page_number,
         },
     )
 
 
 @require_GET
+@condition(etag_func=_group_etag)
 def group_posts(request, slug: str):
     """View-функция для страницы сообщества.
     """
@@ -48,25 +170,56 @@ def group_posts(request, slug: str):
         request,
         'posts/group.html',
         {
-            **_all_posts(request, group.posts.all()),
+            **_all_posts(
+                request,
+                _feed_posts(group=group),
+                caching.group_scope(group.pk),
+            ),
+            **_fragment_cache(caching.group_scope(group.pk)),
             'group': group,
         },
     )
 
 
+@require_GET
+def search(request):
+    """View-функция для поиска постов по тексту. Найденные посты выводятся
+    начиная с самых релевантных.
+    """
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search_posts(_feed_posts(), query), POSTS_PER_PAGE)
+    return render(
+        request,
+        'posts/search.html',
+        {
+            'page': paginator.get_page(request.GET.get('page')),
+            'query': query,
+            'page_query': urlencode({'q': query}) + '&',
+        },
+    )
+
+
 def _get_author_info(username):
     """Функция для получения информации об авторе поста по username.
     """
-    author = get_object_or_404(User, username=username)
-    posts_count = author.posts.count()
-    subscribers = author.following.count()
-    signed = author.follower.count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+    )
+    return _author_info(author, username)
+
+
+def _author_info(author, username):
+    """Функция возвращает информацию об авторе author для блока
+    posts/author_info.html. Счётчики берутся из author.stats.
+    """
+    stats = get_author_stats(author)
     return {
         'author': author,
-        'posts_count': posts_count,
+        'posts_count': stats.posts_count,
         'username': username,
-        'subscribers': subscribers,
-        'signed': signed,
+        'subscribers': stats.followers_count,
+        'signed': stats.following_count,
     }
 
 
@@ -76,25 +229,23 @@ def _check_follow(request, user_author):
     return user_author.following.filter(user=request.user).exists()
 
 
-def _add_context_following_auth_user(request, context, author):
-    """Функция добавляет в словарь контекста context ключ following для
-    авторизованного пользователя.
-    """
-    if request.user.is_authenticated:
-        context['following'] = _check_follow(request, author)
-
-
 @require_GET
+@condition(etag_func=_profile_etag)
+@cache_page_with_holes(_author_generation)
 def profile(request, username):
     """View-функция для страницы профайла пользователя.
     """
     author_info = _get_author_info(username)
-    post_list = author_info['author'].posts.all()
+    post_list = _feed_posts(author=author_info['author'])
     context = {
         **author_info,
-        **_all_posts(request, post_list),
+        **_all_posts(
+            request,
+            post_list,
+            caching.author_scope(author_info['author'].pk),
+        ),
+        **_fragment_cache(caching.author_scope(author_info['author'].pk)),
     }
-    _add_context_following_auth_user(request, context, author_info['author'])
     return render(
         request,
         'posts/profile.html',
@@ -102,22 +253,42 @@ def profile(request, username):
     )
 
 
+def _comments_page(post_id, cursor):
+    """Функция возвращает страницу комментариев поста post_id, следующую
+    за курсором cursor (первую, если курсора нет). Авторы комментариев
+    подгружаются тем же запросом, поэтому стоимость страницы не зависит
+    от числа комментариев у поста.
+    """
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COMMENTS_PER_PAGE,
+        'created',
+    )
+    return paginator.get_page(cursor)
+
+
 @require_http_methods(["GET", "POST"])
+@condition(etag_func=_post_etag)
+@cache_page_with_holes(_author_generation)
 def post_view(request, username, post_id):
-    """View-функция для страницы поста.
+    """View-функция для страницы поста. Пост, его автор со счётчиками и
+    группа загружаются одним запросом; пост другого автора - 404.
     """
-    author_info = _get_author_info(username)
-    post = get_object_or_404(Post, id=post_id)
-    author_info['post'] = post
+    post = get_object_or_404(
+        _feed_posts(author__username=username).select_related(
+            'author__stats'
+        ),
+        id=post_id,
+    )
+    author_info = _author_info(post.author, username)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = _comments_page(post.pk, None)
     context = {
         **author_info,
         'post': post,
         'form': form,
         'comments': comments,
     }
-    _add_context_following_auth_user(request, context, author_info['author'])
     return render(
         request,
         'posts/post.html',
@@ -125,6 +296,28 @@ def post_view(request, username, post_id):
     )
 
 
+@require_GET
+def post_comments(request, username, post_id):
+    """View-функция для подгрузки следующей страницы комментариев поста
+    по курсору ?cursor= (кнопка «Load more comments»). Возвращает фрагмент
+    страницы, а не страницу целиком.
+    """
+    post = get_object_or_404(
+        Post.objects.only('pk'),
+        pk=post_id,
+        author__username=username,
+    )
+    return render(
+        request,
+        'posts/comment_list.html',
+        {
+            'comments': _comments_page(post.pk, request.GET.get('cursor')),
+            'username': username,
+            'post': post,
+        },
+    )
+
+
 @require_http_methods(["GET", "POST"])
 @login_required
 def new_post(request):
@@ -142,7 +335,9 @@ def new_post(request):
         )
     new_post = form.save(commit=False)
     new_post.author = request.user
-    new_post.save()
+    with transaction.atomic():
+        new_post.save()
+        thumbnails.pregenerate(new_post)
     return redirect('index')
 
 
@@ -166,7 +361,11 @@ def post_edit(request, username, post_id):
         instance=edit_post,
     )
     if form.is_valid():
-        edit_post.save()
+        # Счётчик комментариев мог измениться, пока пост редактировался:
+        # сохраняем только поля формы, чтобы не записать старое значение
+        edit_post.save(update_fields=[*PostForm.Meta.fields, 'updated'])
+        if 'image' in form.changed_data:
+            thumbnails.pregenerate(edit_post)
         return path_post
     return render(
         request,
@@ -206,8 +405,7 @@ def follow_index(request):
     которых подписан текущий пользователь. Видна только авторизованным
     пользователям.
     """
-    post_list = Post.objects.prefetch_related('author').filter(
-        author__following__user=request.user)
+    post_list = timeline_posts(_feed_posts(), request.user)
     return render(
         request,
         'posts/follow.html',
@@ -226,19 +424,18 @@ def _redirect_follow(request, username, follow):
     )
     if author_follow == request.user:
         return path_to_follow
-    check_following = _check_follow(request, author_follow)
-    if not check_following and follow:
-        Follow.objects.create(
-            author=author_follow,
-            user=request.user,
-        )
-        return path_to_follow
-    elif check_following and not follow:
-        Follow.objects.get(
-            user=request.user,
-            author=author_follow,
-        ).delete()
-        return path_to_follow
+    with transaction.atomic():
+        check_following = _check_follow(request, author_follow)
+        if not check_following and follow:
+            Follow.objects.create(
+                author=author_follow,
+                user=request.user,
+            )
+        elif check_following and not follow:
+            Follow.objects.get(
+                user=request.user,
+                author=author_follow,
+            ).delete()
     return path_to_follow
 
 
@@ -2,7 +2,10 @@
 """
 from http import HTTPStatus
 
+from django.conf import settings
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
 
 
 def page_not_found(request, exception):
@@ -22,3 +25,18 @@ def server_error(request):
         'misc/500.html',
         status=HTTPStatus.INTERNAL_SERVER_ERROR,
     )
+
+
+def serve_media(request, path, document_root=None):
+    """View-функция для раздачи медиафайлов при разработке. Картинки постов
+    названы по хешу содержимого, а миниатюры - по картинке и параметрам,
+    поэтому файлы не меняются и кешируются без ограничения срока.
+    """
+    response = serve(request, path, document_root=document_root)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.MEDIA_CACHE_MAX_AGE,
+        immutable=True,
+    )
+    return response
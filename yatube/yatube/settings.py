@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.middleware.HolesMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -83,11 +85,68 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# кеш должен быть общим для всех процессов сервера: счётчики поколений,
+# по которым сбрасываются фрагменты, страницы и ETag, хранятся в нём;
+# адреса memcached задаются через запятую в переменной окружения
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION')
+if MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION.split(','),
+        }
+    }
+    # время хранения счётчиков поколений и числа постов лент
+    POSTS_GENERATION_TIMEOUT = None
+    INVALIDATED_CACHE_TIMEOUT = 60 * 60 * 12
+else:
+    # в памяти процесса сброс поколения не виден другим процессам,
+    # поэтому всё, что зависит от поколений, хранится недолго
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
     }
+    POSTS_GENERATION_TIMEOUT = 20
+    INVALIDATED_CACHE_TIMEOUT = 20
+# время хранения фрагментов лент постов; фрагменты сбрасываются при
+# изменении постов и комментариев ленты
+POSTS_FRAGMENT_CACHE_TIMEOUT = INVALIDATED_CACHE_TIMEOUT
+# время хранения страниц профайла и поста; страницы сбрасываются при
+# изменении постов, комментариев и подписок автора
+POSTS_PAGE_CACHE_TIMEOUT = INVALIDATED_CACHE_TIMEOUT
+# время хранения карточек постов; ключ карточки меняется при изменении поста
+POSTS_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# число постов ленты берётся из кеша и сверяется с базой данных не чаще
+# одного раза за интервал; ленты меньше лимита считаются точно
+POSTS_COUNT_RECONCILE_INTERVAL = min(60 * 10, INVALIDATED_CACHE_TIMEOUT)
+POSTS_EXACT_COUNT_LIMIT = 1000
+# миниатюры картинок постов в шаблонах: для каждой создаются варианты всех
+# ширин widths в форматах formats с пропорциями geometry, браузер выбирает
+# вариант по srcset и sizes; миниатюры создаются после сохранения поста в
+# фоновом пуле из POSTS_THUMBNAIL_WORKERS потоков
+POSTS_THUMBNAILS = {
+    'card': {
+        'geometry': '960x339',
+        'options': {'crop': 'center', 'upscale': True, 'quality': 80},
+        'widths': (480, 720, 960),
+        'formats': ('WEBP', 'JPEG'),
+        'sizes': '(min-width: 1200px) 1110px, 100vw',
+    },
 }
+POSTS_THUMBNAIL_WORKERS = 2
+# миниатюры картинок не больше этого числа точек создаются сразу
+POSTS_THUMBNAIL_INLINE_PIXELS = 640 * 480
+# сколько секунд карточка выводит заглушку вместо незаконченной миниатюры
+POSTS_THUMBNAIL_PENDING_TIMEOUT = 60
+# через сколько секунд снова пробовать создать миниатюры картинки, для
+# которой это не удалось
+POSTS_THUMBNAIL_RETRY_TIMEOUT = 60 * 60
+# доля запросов в процентах, для которых ProfilingMiddleware выводит
+# заголовок Server-Timing и строку лога с профилем; 0 - профилирование
+# выключено
+POSTS_PROFILING_SAMPLE_RATE = 0
 
 
 # Database
@@ -143,6 +202,19 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# медиафайлы не меняются после записи (см. posts.storage), поэтому
+# кешируются браузером и CDN на год
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+# Лента подписок /follow/
+# при подписке в ленту добавляются все посты автора;
+# при подписке в ленту сразу добавляется столько последних постов автора,
+# остальные добавляются в фоновом потоке
+POSTS_TIMELINE_BACKFILL = 100
+# при большем числе подписчиков посты автора не раскладываются по лентам,
+# а добавляются в ленту при чтении
+POSTS_TIMELINE_FANOUT_LIMIT = 10000
 
 
 # Login
@@ -5,6 +5,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from views import serve_media
+
 urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('users.urls')),
@@ -19,6 +21,7 @@ handler500 = 'views.server_error'
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL,
+        view=serve_media,
         document_root=settings.MEDIA_ROOT
     )
     urlpatterns += static(